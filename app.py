@@ -1,37 +1,49 @@
 import asyncio
+import json
 import os
-import pickle
-import sys
+from contextlib import aclosing
 
 from dotenv import load_dotenv
 from quart import Quart, make_response, redirect, render_template, request, url_for
 
+from config_loader import load_config
+from conversation_store import store_from_env
+from model_factory import client_registry
 from palette import Palette
+from result_cache import result_cache_from_env
+from router import TieredRouter, default_router_stats
+from session_registry import SessionRegistry
+from worker_pool import PaletteWorkerPool, PoolBusyError
 
 load_dotenv()
 app = Quart(__name__)
 
-# Store conversations in memory
-conversations = {}
+# Conversation transcripts, in memory or on disk depending on PALETTE_STORE
+conversations = store_from_env()
+
+# Messages returned per page when reading a conversation
+PAGE_SIZE = int(os.getenv("PALETTE_PAGE_SIZE", "200"))
 
 # Helper script that will run in a separate process
 HELPER_SCRIPT = """
-import asyncio
 import os
-import pickle
-import sys
 from dotenv import load_dotenv
+from config_loader import load_config
 from palette import Palette
+from result_cache import result_cache_from_env
+from worker_pool import serve_worker
 
 load_dotenv()
 
-def main():
-    # Get input from stdin
-    input_data = sys.stdin.buffer.read()
-    question = pickle.loads(input_data)
-    
+# Opt-in cache of whole-team results, selected by PALETTE_RESULT_CACHE
+result_cache = result_cache_from_env()
+
+def build_palette():
+    config_path = os.getenv("PALETTE_CONFIG")
+    if config_path:
+        return Palette(config=load_config(config_path), result_cache=result_cache)
     # Initialize Palette with the same parameters as in your app
-    team = Palette(
+    return Palette(
         "ollama",
         "openai",
         "openai",
@@ -57,16 +69,13 @@ def main():
         behaviour_3="Code_Tester2",
         behaviour_4="Code_Tester3",
         token_threshold=150,
+        result_cache=result_cache,
+        ollama_keep_alive=os.getenv("PALETTE_OLLAMA_KEEP_ALIVE", "30m"),
     )
-    
-    # Run the team and get the result
-    result = team.run_team(question)
-    
-    # Write result to stdout
-    sys.stdout.buffer.write(pickle.dumps(result))
 
 if __name__ == "__main__":
-    main()
+    # Keep a warm Palette and answer questions until the pool closes stdin
+    serve_worker(build_palette)
 """
 
 # Create the helper script file if it doesn't exist
@@ -74,26 +83,127 @@ with open("palette_helper.py", "w") as f:
     f.write(HELPER_SCRIPT)
 
 
-async def run_palette_in_subprocess(question):
-    """Run the Palette team in a separate process"""
-    # Create subprocess
-    process = await asyncio.create_subprocess_exec(
-        sys.executable,
-        "palette_helper.py",
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+# "pool" runs teams on warm helper processes, "inprocess" awaits them here
+PALETTE_MODE = os.getenv("PALETTE_MODE", "pool")
+
+# Long-lived helper processes, each holding a warm Palette
+worker_pool = PaletteWorkerPool.from_env("palette_helper.py")
+
+
+# Opt-in cache of whole-team results, selected by PALETTE_RESULT_CACHE
+result_cache = result_cache_from_env()
+
+
+# Team definition file (JSON or YAML, see config_loader.py); when unset the
+# default coding team below is used
+PALETTE_CONFIG = os.getenv("PALETTE_CONFIG")
+
+
+def build_palette(**kwargs):
+    """Build the team used by the web app, by default the coding team."""
+    if PALETTE_CONFIG:
+        return Palette(
+            config=load_config(PALETTE_CONFIG), result_cache=result_cache, **kwargs
+        )
+    return Palette(
+        "ollama",
+        "openai",
+        "openai",
+        "openai",
+        "llama3",
+        "gemini-1.5-flash-8b",
+        "gemini-1.5-flash-8b",
+        "gemini-1.5-flash-8b",
+        system_message_1="You are going to answer the coding problem in c++ that are from leetcode with no explanation.",
+        system_message_2="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
+        system_message_3="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
+        system_message_4="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
+        description_1="A helpful assistant that will give the answer to the coding problem in c++, with no explanation",
+        description_2="A helpful assistant that review the answer of the coding problem in c++.",
+        description_3="A helpful assistant that review the answer of the coding problem in c++.",
+        description_4="A helpful assistant that review the answer of the coding problem in c++.",
+        termination_text="APPROVE",
+        api_key_2=os.getenv("API_KEY"),
+        api_key_3=os.getenv("API_KEY"),
+        api_key_4=os.getenv("API_KEY"),
+        behaviour_1="Coding_Assistant",
+        behaviour_2="Code_Tester1",
+        behaviour_3="Code_Tester2",
+        behaviour_4="Code_Tester3",
+        token_threshold=150,
+        result_cache=result_cache,
+        ollama_keep_alive=os.getenv("PALETTE_OLLAMA_KEEP_ALIVE", "30m"),
+        **kwargs,
     )
 
-    # Send the question to the subprocess
-    stdout, stderr = await process.communicate(pickle.dumps(question))
 
-    if process.returncode != 0:
-        error_message = stderr.decode() if stderr else "Unknown error"
-        raise Exception(f"Palette helper script failed: {error_message}")
+# "1" answers each question with the smallest team likely to handle it,
+# escalating when reviewers reject (in-process mode only, see router.py)
+PALETTE_ROUTING = os.getenv("PALETTE_ROUTING") == "1"
+
+
+def build_session_team():
+    palette = build_palette()
+    return TieredRouter(palette) if PALETTE_ROUTING else palette
+
+
+# Palette instances and surveillance logs per conversation
+sessions = SessionRegistry(
+    build_session_team, ttl=float(os.getenv("PALETTE_SESSION_TTL", "1800"))
+)
+
+
+async def evict_sessions_periodically(interval=60):
+    while True:
+        await asyncio.sleep(interval)
+        await sessions.evict_expired()
+        conversations.evict_expired()
+        await client_registry.close_idle()
 
-    # Parse the result from the subprocess
-    return pickle.loads(stdout)
+
+@app.before_serving
+async def start_worker_pool():
+    if PALETTE_MODE == "pool":
+        await worker_pool.start()
+    app.session_sweeper = asyncio.create_task(evict_sessions_periodically())
+
+
+@app.after_serving
+async def stop_worker_pool():
+    app.session_sweeper.cancel()
+    await sessions.close()
+    await worker_pool.close()
+    conversations.close()
+    await client_registry.close_all()
+    if result_cache is not None:
+        result_cache.close()
+
+
+async def run_palette_in_subprocess(question, session):
+    """Run the Palette team on a pooled helper process"""
+    return await worker_pool.submit(question, log_sink=session.record_logs)
+
+
+async def run_palette_in_process(question, session):
+    """Run the Palette team on this server's own event loop"""
+    return await session.run(question)
+
+
+async def run_palette(question, conversation_id):
+    """Run a question with the configured execution mode"""
+    session = sessions.get_or_create(conversation_id)
+    if PALETTE_MODE == "inprocess":
+        return await run_palette_in_process(question, session)
+    return await run_palette_in_subprocess(question, session)
+
+
+def stream_palette(question, conversation_id):
+    """Stream a question's events with the configured execution mode"""
+    session = sessions.get_or_create(conversation_id)
+    if PALETTE_MODE == "inprocess":
+        return session.stream(question)
+    # Each event is relayed as soon as the worker writes its frame
+    return worker_pool.stream(question, log_sink=session.record_logs)
 
 
 def process_palette_result(result):
@@ -133,9 +243,9 @@ def process_palette_result(result):
 @app.route("/", methods=["GET", "POST"])
 async def chat():
     conversation_id = request.cookies.get("conversation_id")
-    if not conversation_id or conversation_id not in conversations:
+    if not conversation_id or not conversations.exists(conversation_id):
         conversation_id = os.urandom(16).hex()
-        conversations[conversation_id] = []
+        conversations.create(conversation_id)
 
     if request.method == "POST":
         form = await request.form
@@ -143,28 +253,29 @@ async def chat():
 
         if question:
             # Add user question to conversation
-            conversations[conversation_id].append(
-                {"source": "user", "content": question}
-            )
+            user_message = {"source": "user", "content": question}
 
             try:
-                # Use the subprocess to run the Palette team
-                result = await run_palette_in_subprocess(question)
+                result = await run_palette(question, conversation_id)
 
                 # Process the result properly
                 processed_results = process_palette_result(result)
-                conversations[conversation_id].extend(processed_results)
+                conversations.extend(
+                    conversation_id, [user_message] + processed_results
+                )
 
             except Exception as e:
-                conversations[conversation_id].append(
-                    {"source": "system", "content": f"Error: {str(e)}"}
+                conversations.extend(
+                    conversation_id,
+                    [user_message, {"source": "system", "content": f"Error: {str(e)}"}],
                 )
 
         return redirect(url_for("chat"))
 
     response = await make_response(
         await render_template(
-            "index.html", conversation=conversations.get(conversation_id, [])
+            "index.html",
+            conversation=conversations.read_tail(conversation_id, PAGE_SIZE),
         )
     )
     response.set_cookie("conversation_id", conversation_id)
@@ -173,41 +284,12 @@ async def chat():
 
 @app.route("/logs")
 async def view_logs():
-    # You need access to the Palette instance used for the last run
-    # For now, let's just re-run it for example purposes (replace this logic with actual session-based retrieval)
-    test_question = "print hello world in c++"
-
-    try:
-        palette_instance = Palette(
-            "ollama",
-            "openai",
-            "openai",
-            "openai",
-            "llama3",
-            "gemini-1.5-flash-8b",
-            "gemini-1.5-flash-8b",
-            "gemini-1.5-flash-8b",
-            system_message_1="You are going to answer the coding problem in c++ that are from leetcode with no explanation.",
-            system_message_2="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
-            system_message_3="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
-            system_message_4="You are going to review the generated code if the answer is correct then answer as 'APPROVE'",
-            description_1="A helpful assistant that will give the answer to the coding problem in c++, with no explanation",
-            description_2="A helpful assistant that review the answer of the coding problem in c++.",
-            description_3="A helpful assistant that review the answer of the coding problem in c++.",
-            description_4="A helpful assistant that review the answer of the coding problem in c++.",
-            termination_text="APPROVE",
-            api_key_2=os.getenv("API_KEY"),
-            api_key_3=os.getenv("API_KEY"),
-            api_key_4=os.getenv("API_KEY"),
-            behaviour_1="Coding_Assistant",
-            behaviour_2="Code_Tester1",
-            behaviour_3="Code_Tester2",
-            behaviour_4="Code_Tester3",
-            token_threshold=150,
-        )
-        logs = palette_instance.get_surveillance_logs()
-    except Exception as e:
-        logs = [f"Error while getting logs: {str(e)}"]
+    # Read the live surveillance log of the conversation's own session
+    conversation_id = request.args.get(
+        "conversation_id", request.cookies.get("conversation_id")
+    )
+    session = sessions.get(conversation_id) if conversation_id else None
+    logs = session.get_logs() if session else []
 
     return await render_template("logs.html", logs=logs)
 
@@ -217,30 +299,34 @@ async def view_logs():
 async def api_chat():
     conversation_id = request.cookies.get("conversation_id", os.urandom(16).hex())
 
-    if conversation_id not in conversations:
-        conversations[conversation_id] = []
+    if not conversations.exists(conversation_id):
+        conversations.create(conversation_id)
 
     json_data = await request.get_json()
     question = json_data.get("question", "")
 
     if question:
-        conversations[conversation_id].append({"source": "user", "content": question})
+        user_message = {"source": "user", "content": question}
 
         try:
-            result = await run_palette_in_subprocess(question)
+            result = await run_palette(question, conversation_id)
 
             # Process the result properly
             processed_results = process_palette_result(result)
-            conversations[conversation_id].extend(processed_results)
+            conversations.extend(conversation_id, [user_message] + processed_results)
 
+        except PoolBusyError as e:
+            return {"error": str(e), "conversation_id": conversation_id}, 503
         except Exception as e:
-            conversations[conversation_id].append(
-                {"source": "system", "content": f"Error: {str(e)}"}
+            conversations.extend(
+                conversation_id,
+                [user_message, {"source": "system", "content": f"Error: {str(e)}"}],
             )
 
     response = await make_response(
         {
-            "conversation": conversations[conversation_id],
+            "conversation": conversations.read_tail(conversation_id, PAGE_SIZE),
+            "total": conversations.count(conversation_id),
             "conversation_id": conversation_id,
         }
     )
@@ -248,6 +334,98 @@ async def api_chat():
     return response
 
 
+def format_sse(event):
+    """Encode one Palette stream event as a server-sent event."""
+    event_type = event.get("type", "message")
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+@app.route("/api/chat/stream", methods=["POST"])
+async def api_chat_stream():
+    """Stream each agent message to the client as soon as it is produced."""
+    conversation_id = request.cookies.get("conversation_id", os.urandom(16).hex())
+
+    json_data = await request.get_json()
+    question = json_data.get("question", "")
+    if not question:
+        return {"error": "No question provided"}, 400
+
+    conversations.append(conversation_id, {"source": "user", "content": question})
+
+    async def events():
+        try:
+            async with aclosing(stream_palette(question, conversation_id)) as stream:
+                async for event in stream:
+                    yield event
+        except Exception as e:
+            yield {"source": "system", "type": "error", "content": f"Error: {str(e)}"}
+
+    async def event_stream():
+        first_message = True
+        async with aclosing(events()) as stream:
+            async for event in stream:
+                event_type = event.get("type")
+                if event_type == "usage":
+                    conversations.append(
+                        conversation_id,
+                        {
+                            "source": "system",
+                            "content": f"Token count: {event['token_count']}",
+                        },
+                    )
+                elif event_type is None:
+                    # The team echoes the task back first; the user
+                    # message is already stored above.
+                    if first_message and event["source"] == "user":
+                        first_message = False
+                        continue
+                    first_message = False
+                    conversations.append(conversation_id, event)
+                elif event_type == "reset":
+                    first_message = True
+                    conversations.append(
+                        conversation_id,
+                        {"source": "system", "content": event["content"]},
+                    )
+                elif event_type in ("resume", "error"):
+                    conversations.append(
+                        conversation_id,
+                        {"source": "system", "content": event["content"]},
+                    )
+                yield format_sse(event)
+
+    response = await make_response(
+        event_stream(),
+        {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+    response.timeout = None
+    response.set_cookie("conversation_id", conversation_id)
+    return response
+
+
+@app.route("/api/conversation")
+async def api_conversation():
+    """Read one page of a conversation's transcript."""
+    conversation_id = request.args.get(
+        "conversation_id", request.cookies.get("conversation_id")
+    )
+    if not conversation_id or not conversations.exists(conversation_id):
+        return {"error": "Unknown conversation"}, 404
+
+    offset = request.args.get("offset", 0, type=int)
+    limit = min(request.args.get("limit", PAGE_SIZE, type=int), PAGE_SIZE)
+    return {
+        "conversation": conversations.read(conversation_id, offset, limit),
+        "offset": offset,
+        "total": conversations.count(conversation_id),
+        "conversation_id": conversation_id,
+    }
+
+
 # Add route to update HELPER_SCRIPT with auto team creation
 @app.route("/api/update_team", methods=["POST"])
 async def update_team():
@@ -259,42 +437,47 @@ async def update_team():
 
     # Create a new helper script with auto team creation
     new_helper_script = """
-import asyncio
 import os
-import pickle
-import sys
 from dotenv import load_dotenv
 from palette import Palette
+from worker_pool import serve_worker
 
 load_dotenv()
 
-def main():
-    # Get input from stdin
-    input_data = sys.stdin.buffer.read()
-    question = pickle.loads(input_data)
-    
+def build_palette():
     # Initialize Palette with auto team creation
-    team = Palette(default_model="gpt-4", default_provider="openai")
-    
+    return Palette(default_model="gpt-4", default_provider="openai")
+
+def prepare_job(team, question):
     # Auto-create a team based on the question
     team.auto_create_team(question, api_key=os.getenv("API_KEY"))
-    
-    # Run the team and get the result
-    result = team.run_team(question)
-    
-    # Write result to stdout
-    sys.stdout.buffer.write(pickle.dumps(result))
 
 if __name__ == "__main__":
-    main()
+    serve_worker(build_palette, prepare_job)
 """
 
     # Write the new helper script
     with open("palette_helper.py", "w") as f:
         f.write(new_helper_script)
 
+    # Replace the warm workers so they load the new helper script; in-process
+    # mode has no workers to replace
+    if PALETTE_MODE == "pool":
+        await worker_pool.restart()
+
     return {"success": True, "message": "Team updated with auto-creation capability"}
 
 
+@app.route("/api/metrics")
+async def metrics():
+    return {
+        "worker_pool": worker_pool.metrics(),
+        "sessions": sessions.metrics(),
+        "model_clients": client_registry.metrics(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "router": default_router_stats.metrics() if PALETTE_ROUTING else None,
+    }
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+
+class BatchStats:
+    """Aggregates per-task results into a throughput and token report."""
+
+    def __init__(self, tasks: int, concurrency: int):
+        self.tasks = tasks
+        self.concurrency = concurrency
+        self.started_at = time.perf_counter()
+        self.results: List[Dict[str, Any]] = []
+
+    def record(self, result: Dict[str, Any]):
+        self.results.append(result)
+
+    def report(self) -> Dict[str, Any]:
+        wall_time = time.perf_counter() - self.started_at
+        succeeded = [result for result in self.results if result["error"] is None]
+        latencies = sorted(result["elapsed"] for result in succeeded)
+        tokens = sum(result["token_count"] for result in succeeded)
+        prompt_tokens = sum(result["prompt_tokens"] for result in succeeded)
+        completion_tokens = sum(result["completion_tokens"] for result in succeeded)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)]
+
+        return {
+            "tasks": self.tasks,
+            "completed": len(self.results),
+            "succeeded": len(succeeded),
+            "failed": len(self.results) - len(succeeded),
+            "timeouts": sum(1 for result in self.results if result["timed_out"]),
+            "retries": sum(result["attempts"] - 1 for result in self.results),
+            "concurrency": self.concurrency,
+            "wall_time": wall_time,
+            "tasks_per_second": len(succeeded) / wall_time if wall_time else 0.0,
+            "latency": {
+                "mean": statistics.fmean(latencies) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "token_count": tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_task": tokens / len(succeeded) if succeeded else 0.0,
+            "tokens_per_second": tokens / wall_time if wall_time else 0.0,
+        }
+
+
+def _new_result(index: int, task: str) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "task": task,
+        "conversation": [],
+        "token_count": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "attempts": 0,
+        "timed_out": False,
+        "error": None,
+        "elapsed": 0.0,
+    }
+
+
+async def _run_task(team, index: int, task: str, timeout, retries: int):
+    """Answer one task on ``team``, retrying failures and timeouts."""
+    # palette imports this module, so import it here rather than at the top
+    from palette import InputRejectedError
+
+    started = time.perf_counter()
+    result = _new_result(index, task)
+
+    while result["attempts"] <= retries:
+        result["attempts"] += 1
+        result["timed_out"] = False
+        try:
+            # A timed-out attempt can leave the team mid-turn
+            await team.resetting_team()
+            conversation, token_count = await asyncio.wait_for(
+                team._run_once(task), timeout
+            )
+        except InputRejectedError as e:
+            result["error"] = str(e)
+            break
+        except asyncio.TimeoutError:
+            result["timed_out"] = True
+            result["error"] = f"Timed out after {timeout}s"
+        except Exception as e:
+            result["error"] = f"Error running team: {str(e)}"
+        else:
+            stats = team.last_run_stats
+            result.update(
+                conversation=conversation,
+                token_count=token_count,
+                prompt_tokens=stats.get("prompt_tokens", 0),
+                completion_tokens=stats.get("completion_tokens", 0),
+                error=None,
+            )
+            break
+
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+async def arun_batch(
+    palette,
+    tasks,
+    concurrency: int = 4,
+    timeout: Optional[float] = None,
+    retries: int = 0,
+    ordered: bool = False,
+    report_path: Optional[str] = None,
+):
+    """Answer ``tasks`` with up to ``concurrency`` isolated teams at once.
+
+    Each worker runs its own clone of ``palette`` (sharing its model
+    clients) and takes the next task when it finishes one. Results are
+    yielded as dicts as soon as they complete, or in task order when
+    ``ordered`` is set. Each attempt is limited to ``timeout`` seconds and
+    failures are retried up to ``retries`` times. The aggregate report is
+    stored in ``palette.last_batch_report`` and written to ``report_path``
+    as JSON.
+    """
+    tasks = list(tasks)
+    stats = BatchStats(len(tasks), concurrency)
+    pending: asyncio.Queue = asyncio.Queue()
+    for index in range(len(tasks)):
+        pending.put_nowait(index)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        try:
+            team = palette.clone(auto_monitor=palette.surveillance.monitoring_active)
+        except Exception as e:
+            # Fail this worker's share of the tasks instead of hanging
+            while not pending.empty():
+                index = pending.get_nowait()
+                result = _new_result(index, tasks[index])
+                result["error"] = f"Error building team: {str(e)}"
+                finished.put_nowait(result)
+            return
+
+        try:
+            while not pending.empty():
+                index = pending.get_nowait()
+                finished.put_nowait(
+                    await _run_task(team, index, tasks[index], timeout, retries)
+                )
+        finally:
+            await team.aclose()
+
+    workers = [
+        asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(tasks)))
+    ]
+    try:
+        buffered = {}
+        next_index = 0
+        for _ in range(len(tasks)):
+            result = await finished.get()
+            stats.record(result)
+            if not ordered:
+                yield result
+                continue
+            buffered[result["index"]] = result
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        report = stats.report()
+        palette.last_batch_report = report
+        if report_path:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
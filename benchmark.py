@@ -0,0 +1,346 @@
+"""Offline benchmarks for Palette's own overhead.
+
+Every model call goes to the "fake" provider, so this runs on a laptop
+without network access or API keys:
+
+    python benchmark.py --output benchmark_results.json
+
+Each section reports timings in milliseconds (or microseconds where
+noted); compare the JSON output between commits to catch regressions.
+The startup section also checks cold import and construction times
+against budgets and exits with status 1 when either is over.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Keep surveillance off Gemini and the app on in-process teams
+os.environ["API_KEY"] = ""
+os.environ.setdefault("PALETTE_MODE", "inprocess")
+
+from autogen_agentchat.messages import TextMessage
+
+from fake_team import QUESTION, fake_team_config
+from palette import Palette
+from token_counter import count_many, count_tokens, token_cache_info
+
+
+def fake_team(approve_after=5, latency=0.0, **kwargs):
+    return Palette(config=fake_team_config(approve_after, latency), **kwargs)
+
+
+def summarize(samples, scale=1000.0):
+    """Mean/p50/p95/min of samples in seconds, scaled (to ms by default)."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered) * scale,
+        "p50": ordered[len(ordered) // 2] * scale,
+        "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * scale,
+        "min": ordered[0] * scale,
+    }
+
+
+def bench_construction(iterations):
+    """Time to build a four-agent team; the first build also creates clients."""
+    started = time.perf_counter()
+    first = fake_team()
+    cold = time.perf_counter() - started
+    asyncio.run(first.aclose())
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        palette = fake_team()
+        samples.append(time.perf_counter() - started)
+        asyncio.run(palette.aclose())
+    return {"cold_ms": cold * 1000, "warm_ms": summarize(samples)}
+
+
+async def _time_runs(palette, runs):
+    samples = []
+    turns = 0
+    for _ in range(runs):
+        await palette.resetting_team()
+        started = time.perf_counter()
+        conversation, _ = await palette.arun_team(QUESTION)
+        samples.append(time.perf_counter() - started)
+        turns = sum(1 for message in conversation if message["source"] != "user")
+    return samples, turns
+
+
+# Run in a fresh interpreter so module imports are measured cold
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from fake_team import QUESTION, fake_team_config
+from palette import Palette
+imported = time.perf_counter()
+Palette(config=json.loads(sys.argv[1]), lazy_clients=sys.argv[2] == "lazy")
+built = time.perf_counter()
+print(json.dumps({"import": imported - started, "construction": built - imported}))
+"""
+
+
+def bench_startup(samples, import_budget_ms, construction_budget_ms):
+    """Cold ``import palette`` and first-team construction in new processes.
+
+    Construction is timed with lazy clients (the default) and eager ones.
+    The team uses Ollama, whose clients are built without contacting a
+    server, so the eager figure includes a real provider SDK import. The
+    medians are compared against the budgets.
+    """
+    config = fake_team_config()
+    for n in range(1, 5):
+        config[f"provider_{n}"] = "ollama"
+        config[f"agent_{n}"] = "llama3"
+    config = json.dumps(config)
+    timings = {"import": [], "construction": [], "eager_construction": []}
+    for _ in range(samples):
+        for mode in ("lazy", "eager"):
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_PROBE, config, mode],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout
+            probe = json.loads(output.strip().splitlines()[-1])
+            if mode == "lazy":
+                timings["import"].append(probe["import"])
+                timings["construction"].append(probe["construction"])
+            else:
+                timings["eager_construction"].append(probe["construction"])
+
+    results = {name: summarize(values) for name, values in timings.items()}
+    results["budgets"] = {
+        "import_ms": {
+            "budget": import_budget_ms,
+            "ok": results["import"]["p50"] <= import_budget_ms,
+        },
+        "construction_ms": {
+            "budget": construction_budget_ms,
+            "ok": results["construction"]["p50"] <= construction_budget_ms,
+        },
+    }
+    return results
+
+
+def bench_orchestration(runs, approve_after):
+    """Wall time per run and per agent turn with zero-latency models.
+
+    Everything measured here is Palette and autogen overhead. The
+    surveillance figure is the extra time per turn with monitoring on.
+    """
+    results = {}
+    for topology in ("round_robin", "fanout"):
+        for monitored in (True, False):
+            palette = fake_team(
+                approve_after, topology=topology, auto_monitor=monitored
+            )
+            samples, turns = asyncio.run(_time_runs(palette, runs))
+            asyncio.run(palette.aclose())
+            label = f"{topology}{'' if monitored else '_unmonitored'}"
+            results[label] = {
+                "turns": turns,
+                "run_ms": summarize(samples),
+                "per_turn_ms": statistics.fmean(samples) * 1000 / max(turns, 1),
+            }
+    results["surveillance_per_turn_ms"] = (
+        results["round_robin"]["per_turn_ms"]
+        - results["round_robin_unmonitored"]["per_turn_ms"]
+    )
+    return results
+
+
+def bench_latency_hiding(approve_after, latency):
+    """Round-robin versus fan-out wall time with simulated model latency."""
+    results = {}
+    for topology in ("round_robin", "fanout"):
+        palette = fake_team(approve_after, latency, topology=topology)
+        samples, turns = asyncio.run(_time_runs(palette, 1))
+        asyncio.run(palette.aclose())
+        results[topology] = {"turns": turns, "run_ms": samples[0] * 1000}
+    results["model_latency_ms"] = latency * 1000
+    return results
+
+
+def bench_token_counting(texts):
+    """Microseconds per text: uncached, cached, and batched."""
+    corpus = [f"{QUESTION} #{i}\n{'int x = %d;' % i * 20}" for i in range(texts)]
+
+    started = time.perf_counter()
+    for text in corpus:
+        count_tokens(text)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for text in corpus:
+        count_tokens(text)
+    warm = time.perf_counter() - started
+
+    batch = [text + " batch" for text in corpus]
+    started = time.perf_counter()
+    count_many(batch)
+    batched = time.perf_counter() - started
+
+    return {
+        "texts": texts,
+        "uncached_us": cold / texts * 1e6,
+        "cached_us": warm / texts * 1e6,
+        "batched_us": batched / texts * 1e6,
+        "cache": token_cache_info(),
+    }
+
+
+def bench_surveillance(messages):
+    """Microseconds to evaluate one message, and to scan a long one for errors."""
+    palette = fake_team()
+    surveillance = palette.surveillance
+    stream = [
+        TextMessage(
+            source="primary" if i % 2 == 0 else "critic",
+            content=f"Attempt {i}: {QUESTION} {'fix the loop ' * (i % 7)}",
+        )
+        for i in range(messages)
+    ]
+
+    async def observe_all():
+        surveillance.begin_run()
+        started = time.perf_counter()
+        for message in stream:
+            await surveillance.observe(message)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(observe_all())
+
+    # A long tool output scanned for every error pattern at once
+    tool_output = f"{QUESTION}\n" * 200 + "Error: rate limit reached"
+    started = time.perf_counter()
+    for _ in range(100):
+        surveillance.error_matcher.scan(tool_output)
+    scan = (time.perf_counter() - started) / 100
+
+    asyncio.run(palette.aclose())
+    return {
+        "messages": messages,
+        "per_message_us": elapsed / messages * 1e6,
+        "long_message_chars": len(tool_output),
+        "long_message_scan_us": scan * 1e6,
+    }
+
+
+def bench_app(requests, concurrency, approve_after):
+    """Requests per second through POST /api/chat with in-process teams."""
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(fake_team_config(approve_after), f)
+        config_path = f.name
+    os.environ["PALETTE_CONFIG"] = config_path
+    os.environ["PALETTE_MODE"] = "inprocess"
+
+    import app
+
+    async def run():
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+        async with app.app.test_app() as test_app:
+            client = test_app.test_client()
+
+            async def one(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/api/chat",
+                        json={"question": QUESTION},
+                        headers={"Cookie": f"conversation_id=bench{i % concurrency}"},
+                    )
+                    latencies.append(time.perf_counter() - started)
+                    return response.status_code
+
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*(one(i) for i in range(requests)))
+            wall = time.perf_counter() - started
+        return statuses, latencies, wall
+
+    try:
+        statuses, latencies, wall = asyncio.run(run())
+    finally:
+        os.unlink(config_path)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for status in statuses if status != 200),
+        "requests_per_second": requests / wall,
+        "latency_ms": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--approve-after", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--startup-samples", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--construction-budget-ms", type=float, default=50)
+    parser.add_argument(
+        "--skip", nargs="*", default=[], help="sections to leave out, e.g. app"
+    )
+    args = parser.parse_args()
+
+    sections = {
+        "startup": lambda: bench_startup(
+            args.startup_samples, args.import_budget_ms, args.construction_budget_ms
+        ),
+        "construction": lambda: bench_construction(args.iterations),
+        "orchestration": lambda: bench_orchestration(args.runs, args.approve_after),
+        "latency_hiding": lambda: bench_latency_hiding(
+            args.approve_after, args.latency
+        ),
+        "token_counting": lambda: bench_token_counting(args.texts),
+        "surveillance": lambda: bench_surveillance(args.messages),
+        "app": lambda: bench_app(args.requests, args.concurrency, args.approve_after),
+    }
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": vars(args),
+    }
+    for name, run in sections.items():
+        if name in args.skip:
+            continue
+        print(f"Running {name} benchmark...")
+        results[name] = run()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    over = [
+        name
+        for name, budget in results.get("startup", {}).get("budgets", {}).items()
+        if not budget["ok"]
+    ]
+    if over:
+        print(f"Over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from context_policy import SUMMARY_PROMPT
+from token_counter import count_tokens
+
+
+class ModelSpec(NamedTuple):
+    """What a model can take and what it costs.
+
+    Prices are USD per million tokens, or None when they are unknown.
+    """
+
+    context_window: int
+    input_price: Optional[float]
+    output_price: Optional[float]
+    max_output: int
+
+    @property
+    def priced(self) -> bool:
+        return self.input_price is not None and self.output_price is not None
+
+
+# List prices at the time of writing; pass model_catalog to Palette to
+# override entries or add models. Local models are free but small.
+MODEL_CATALOG: Dict[str, ModelSpec] = {
+    "gpt-4o": ModelSpec(128000, 2.50, 10.00, 16384),
+    "gpt-4o-mini": ModelSpec(128000, 0.15, 0.60, 16384),
+    "gpt-4.1": ModelSpec(1047576, 2.00, 8.00, 32768),
+    "gpt-4.1-mini": ModelSpec(1047576, 0.40, 1.60, 32768),
+    "gpt-4.1-nano": ModelSpec(1047576, 0.10, 0.40, 32768),
+    "gpt-4-turbo": ModelSpec(128000, 10.00, 30.00, 4096),
+    "gpt-4": ModelSpec(8192, 30.00, 60.00, 8192),
+    "gpt-3.5-turbo": ModelSpec(16385, 0.50, 1.50, 4096),
+    "gemini-1.5-flash-8b": ModelSpec(1048576, 0.0375, 0.15, 8192),
+    "gemini-1.5-flash": ModelSpec(1048576, 0.075, 0.30, 8192),
+    "gemini-1.5-pro": ModelSpec(2097152, 1.25, 5.00, 8192),
+    "claude-3-5-sonnet": ModelSpec(200000, 3.00, 15.00, 8192),
+    "claude-3-5-haiku": ModelSpec(200000, 0.80, 4.00, 8192),
+    "claude-3-opus": ModelSpec(200000, 15.00, 75.00, 4096),
+    "claude-3-haiku": ModelSpec(200000, 0.25, 1.25, 4096),
+    "llama3": ModelSpec(8192, 0.0, 0.0, 8192),
+    "llama3.1": ModelSpec(131072, 0.0, 0.0, 8192),
+    "llama3.2": ModelSpec(131072, 0.0, 0.0, 8192),
+    "mistral": ModelSpec(32768, 0.0, 0.0, 8192),
+    "fake": ModelSpec(128000, 0.0, 0.0, 4096),
+}
+
+# Unknown models are assumed small, so plans err on the safe side, and
+# their price is unknown rather than free
+DEFAULT_SPEC = ModelSpec(8192, None, None, 4096)
+
+# Providers that run models locally; an unknown model of theirs costs nothing
+FREE_PROVIDERS = ("ollama", "fake")
+
+# Role and formatting tokens the chat template adds to every message
+MESSAGE_OVERHEAD = 4
+
+# Characters that may follow a catalog name in a dated or pinned variant
+# (gpt-4o-2024-08-06, claude-3-5-sonnet@20240620)
+VARIANT_SEPARATORS = "-@_"
+
+
+def lookup_model(model_name: str, catalog: Optional[Dict[str, ModelSpec]] = None):
+    """The catalog entry for a model name, by exact or longest prefix match.
+
+    Query strings (fake models) and Ollama tags (``llama3:8b``) are ignored.
+    A prefix only matches up to a separator, so ``gpt-4-0613`` is ``gpt-4``
+    but ``gpt-4o`` or ``gpt-4.1`` never are.
+    """
+    catalog = MODEL_CATALOG if catalog is None else catalog
+    name = (model_name or "").partition("?")[0]
+    for candidate in (name, name.partition(":")[0]):
+        if candidate in catalog:
+            return catalog[candidate]
+    prefixes = [
+        key
+        for key in catalog
+        if name.startswith(key) and name[len(key) : len(key) + 1] in VARIANT_SEPARATORS
+    ]
+    if prefixes:
+        return catalog[max(prefixes, key=len)]
+    return DEFAULT_SPEC
+
+
+class AgentEstimate(NamedTuple):
+    """Projected usage of one agent over a run.
+
+    ``summary_tokens`` are spent by the summarizer of a ``summarize``
+    policy, and ``cost`` includes them.
+    """
+
+    name: str
+    model: str
+    turns: int
+    prompt_tokens: int
+    completion_tokens: int
+    peak_prompt_tokens: int
+    context_window: int
+    cost: Optional[float]
+    summary_tokens: int = 0
+
+    @property
+    def fits(self) -> bool:
+        completion = self.completion_tokens // max(self.turns, 1)
+        return self.peak_prompt_tokens + completion <= self.context_window
+
+
+class BudgetPlan(NamedTuple):
+    """The planner's verdict on a job.
+
+    ``action`` is ``"run"`` when the job fits as configured, ``"downsize"``
+    when it fits in ``rounds`` rounds (at most ``max_turns`` agent turns),
+    ``"reroute"`` when it fits with the models in ``overrides``, and
+    ``"reject"`` when nothing fits. ``reasons`` says what didn't fit.
+    ``total_tokens`` includes the summarizers' ``summary_tokens``. ``cost``
+    leaves out the agents in ``unpriced``, whose model has no known price.
+    """
+
+    action: str
+    rounds: int
+    max_turns: Optional[int]
+    agents: List[AgentEstimate]
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    reasons: List[str]
+    overrides: Dict[str, Any]
+    summary_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens + self.summary_tokens
+
+    @property
+    def unpriced(self) -> List[str]:
+        return [agent.name for agent in self.agents if agent.cost is None]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "action": self.action,
+            "rounds": self.rounds,
+            "max_turns": self.max_turns,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "summary_tokens": self.summary_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "unpriced": self.unpriced,
+            "reasons": list(self.reasons),
+            "agents": {
+                agent.name: {
+                    **agent._asdict(),
+                    "cost": None if agent.cost is None else round(agent.cost, 6),
+                    "fits": agent.fits,
+                }
+                for agent in self.agents
+            },
+            "overrides": {
+                key: value
+                for key, value in self.overrides.items()
+                if not key.startswith("api_key")
+            },
+        }
+
+
+class BudgetPlanner:
+    """Estimates a team's tokens and cost before it runs.
+
+    Each agent is described by a dict with its ``name``, ``model``,
+    ``provider``, ``system_tokens``, ``max_tokens`` and context ``policy``
+    (see context_policy.py); ``slot`` is its agent number in Palette. The
+    first agent is the primary. A round is one turn per agent, in order for
+    round-robin teams; in fan-out teams the reviewers of a round all see the
+    transcript up to the primary's answer. Every turn is assumed to use the
+    agent's full ``max_tokens``, or ``completion_tokens`` when uncapped, so
+    the estimate is an upper bound. An agent with a ``summarize`` policy
+    also pays for a summarizer call each time turns fall out of its
+    window, with summaries of ``summary_tokens`` tokens, priced at the
+    policy's own model when it has one.
+
+    ``plan`` checks every agent's largest prompt against its model's
+    context window, and the run against ``token_budget`` and
+    ``cost_budget``. A model missing from the catalog has no price (unless
+    its provider runs it locally): with a ``cost_budget`` it doesn't fit,
+    otherwise a warning is printed once per model. A job that doesn't fit is handled by ``action``:
+    ``"reject"`` refuses it, ``"downsize"`` keeps the most rounds that fit,
+    and ``"reroute"`` first tries swapping models for the ones in
+    ``reroutes`` (model name to ``{"provider", "model", "api_key"}``),
+    then downsizes.
+    """
+
+    def __init__(
+        self,
+        catalog: Optional[Dict[str, ModelSpec]] = None,
+        rounds: int = 3,
+        completion_tokens: int = 400,
+        summary_tokens: int = 300,
+        token_budget: Optional[int] = None,
+        cost_budget: Optional[float] = None,
+        action: str = "downsize",
+        reroutes: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        if action not in ("reject", "downsize", "reroute"):
+            raise ValueError(f"Unsupported budget action: {action}")
+        self.catalog = {**MODEL_CATALOG, **(catalog or {})}
+        self.rounds = rounds
+        self.completion_tokens = completion_tokens
+        self.summary_tokens = summary_tokens
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.action = action
+        self.reroutes = reroutes or {}
+        self._warned = set()
+
+    def spec(self, agent: Dict[str, Any]) -> ModelSpec:
+        spec = lookup_model(agent["model"], self.catalog)
+        if not spec.priced and agent.get("provider") in FREE_PROVIDERS:
+            spec = spec._replace(input_price=0.0, output_price=0.0)
+        if agent.get("num_ctx"):
+            # Ollama truncates at num_ctx whatever the model supports
+            spec = spec._replace(
+                context_window=min(spec.context_window, agent["num_ctx"])
+            )
+        return spec
+
+    def _visible(self, transcript: List[int], policy: Optional[Dict]) -> int:
+        """Prompt tokens of the transcript an agent is sent under ``policy``."""
+        if policy is None:
+            return sum(transcript)
+        if policy["type"] == "last_tokens":
+            kept = 0
+            for tokens in reversed(transcript):
+                if kept and kept + tokens > policy["max_tokens"]:
+                    break
+                kept += tokens
+            return kept
+        window = transcript[-policy["turns"] :] if policy["turns"] else []
+        kept = sum(window)
+        if policy["type"] == "summarize" and len(transcript) > len(window):
+            kept += self.summary_tokens
+        return kept
+
+    def estimate(
+        self,
+        agents: List[Dict[str, Any]],
+        task_tokens: int,
+        rounds: int,
+        topology: str = "round_robin",
+    ) -> List[AgentEstimate]:
+        """Per-agent usage over ``rounds`` rounds."""
+        specs = [self.spec(agent) for agent in agents]
+        completions = [
+            min(agent.get("max_tokens") or self.completion_tokens, spec.max_output)
+            + MESSAGE_OVERHEAD
+            for agent, spec in zip(agents, specs)
+        ]
+        # turns, prompt, completion, peak, summary prompt, summary completion
+        usage = [[0, 0, 0, 0, 0, 0] for _ in agents]
+        summarized = [0 for _ in agents]
+        summary_prompt = count_tokens(SUMMARY_PROMPT) + 2 * MESSAGE_OVERHEAD
+
+        def summarize(i, transcript):
+            # Mirrors SummarizingContext: the turns that left the window since
+            # the last call are folded into the previous summary
+            policy = agents[i].get("policy")
+            if not policy or policy["type"] != "summarize":
+                return
+            dropped = max(len(transcript) - policy["turns"], 0)
+            if dropped <= summarized[i]:
+                return
+            previous = self.summary_tokens if summarized[i] else 0
+            usage[i][4] += (
+                summary_prompt + previous + sum(transcript[summarized[i] : dropped])
+            )
+            usage[i][5] += self.summary_tokens
+            summarized[i] = dropped
+
+        def turn(i, transcript):
+            agent = agents[i]
+            summarize(i, transcript)
+            prompt = (
+                agent.get("system_tokens", 0)
+                + task_tokens
+                + MESSAGE_OVERHEAD
+                + self._visible(transcript, agent.get("policy"))
+            )
+            usage[i][0] += 1
+            usage[i][1] += prompt
+            usage[i][2] += completions[i]
+            usage[i][3] = max(usage[i][3], prompt)
+
+        transcript = []
+        for _ in range(rounds):
+            if topology == "fanout":
+                turn(0, transcript)
+                transcript.append(completions[0])
+                seen = list(transcript)
+                for i in range(1, len(agents)):
+                    turn(i, seen)
+                    transcript.append(completions[i])
+            else:
+                for i in range(len(agents)):
+                    turn(i, transcript)
+                    transcript.append(completions[i])
+
+        return [
+            AgentEstimate(
+                name=agent["name"],
+                model=agent["model"],
+                turns=turns,
+                prompt_tokens=prompt,
+                completion_tokens=completion,
+                peak_prompt_tokens=peak,
+                context_window=spec.context_window,
+                cost=self._cost(
+                    (spec, prompt, completion),
+                    (self._summarizer_spec(agent, spec), *summary),
+                ),
+                summary_tokens=sum(summary),
+            )
+            for agent, spec, (turns, prompt, completion, peak, *summary) in zip(
+                agents, specs, usage
+            )
+        ]
+
+    def _summarizer_spec(self, agent: Dict[str, Any], spec: ModelSpec) -> ModelSpec:
+        """The model that summarizes for ``agent``: the policy's, else its own."""
+        policy = agent.get("policy") or {}
+        if policy.get("provider") and policy.get("model"):
+            return self.spec({"model": policy["model"], "provider": policy["provider"]})
+        return spec
+
+    @staticmethod
+    def _cost(*usages) -> Optional[float]:
+        """USD for ``(spec, prompt, completion)`` usages; None if any unpriced."""
+        cost = 0.0
+        for spec, prompt, completion in usages:
+            if not prompt and not completion:
+                continue
+            if not spec.priced:
+                return None
+            cost += (prompt * spec.input_price + completion * spec.output_price) / 1e6
+        return cost
+
+    def _check(self, estimates: List[AgentEstimate]) -> List[str]:
+        """Everything about the estimates that is over a limit."""
+        reasons = [
+            f"{e.name} ({e.model}) needs {e.peak_prompt_tokens + e.completion_tokens // max(e.turns, 1)}"
+            f" tokens of a {e.context_window}-token context window"
+            for e in estimates
+            if not e.fits
+        ]
+        total = sum(
+            e.prompt_tokens + e.completion_tokens + e.summary_tokens for e in estimates
+        )
+        if self.token_budget and total > self.token_budget:
+            reasons.append(f"{total} tokens is over the budget of {self.token_budget}")
+        unpriced = [e for e in estimates if e.cost is None]
+        if self.cost_budget is not None and unpriced:
+            reasons += [
+                f"{e.name} ({e.model}) has no known price to check against the"
+                f" budget of ${self.cost_budget}"
+                for e in unpriced
+            ]
+        cost = sum(e.cost for e in estimates if e.cost is not None)
+        if self.cost_budget is not None and cost > self.cost_budget:
+            reasons.append(f"${cost:.4f} is over the budget of ${self.cost_budget}")
+        return reasons
+
+    def _warn_unpriced(self, estimates: List[AgentEstimate]):
+        for e in estimates:
+            if e.cost is None and e.model not in self._warned:
+                self._warned.add(e.model)
+                print(
+                    f"Warning: no price known for {e.model}; its cost is left out of"
+                    " the plan. Add it with model_catalog."
+                )
+
+    def _plan(self, action, rounds, estimates, reasons, overrides=None):
+        return BudgetPlan(
+            action=action,
+            rounds=rounds,
+            max_turns=sum(e.turns for e in estimates) if action == "downsize" else None,
+            agents=estimates,
+            prompt_tokens=sum(e.prompt_tokens for e in estimates),
+            completion_tokens=sum(e.completion_tokens for e in estimates),
+            cost=sum(e.cost for e in estimates if e.cost is not None),
+            reasons=reasons,
+            overrides=overrides or {},
+            summary_tokens=sum(e.summary_tokens for e in estimates),
+        )
+
+    def plan(
+        self,
+        agents: List[Dict[str, Any]],
+        task_tokens: int,
+        topology: str = "round_robin",
+    ) -> BudgetPlan:
+        """Decide whether and how to run a job; see the class docstring."""
+        estimates = self.estimate(agents, task_tokens, self.rounds, topology)
+        if self.cost_budget is None:
+            self._warn_unpriced(estimates)
+        reasons = self._check(estimates)
+        if not reasons:
+            return self._plan("run", self.rounds, estimates, [])
+        if self.action == "reject":
+            return self._plan("reject", self.rounds, estimates, reasons)
+
+        if self.action == "reroute":
+            overrides = {}
+            rerouted = []
+            for agent in agents:
+                target = self.reroutes.get(agent["model"].partition("?")[0])
+                if target is None:
+                    rerouted.append(agent)
+                    continue
+                slot = agent.get("slot")
+                overrides[f"provider_{slot}"] = target["provider"]
+                overrides[f"agent_{slot}"] = target["model"]
+                if target.get("api_key"):
+                    overrides[f"api_key_{slot}"] = target["api_key"]
+                rerouted.append(
+                    {
+                        **agent,
+                        "model": target["model"],
+                        "provider": target["provider"],
+                        "num_ctx": None,
+                    }
+                )
+            if overrides:
+                estimates = self.estimate(rerouted, task_tokens, self.rounds, topology)
+                if not self._check(estimates):
+                    return self._plan(
+                        "reroute", self.rounds, estimates, reasons, overrides
+                    )
+
+        for rounds in range(self.rounds - 1, 0, -1):
+            estimates = self.estimate(agents, task_tokens, rounds, topology)
+            if not self._check(estimates):
+                return self._plan("downsize", rounds, estimates, reasons)
+        estimates = self.estimate(agents, task_tokens, 1, topology)
+        return self._plan("reject", 1, estimates, reasons)
+
+
+def agent_profile(
+    name, model, provider, system_message, max_tokens, policy, slot, num_ctx=None
+):
+    """The description of an agent that ``BudgetPlanner`` works from.
+
+    ``num_ctx`` is the context size an Ollama model is loaded with.
+    """
+    return {
+        "name": name,
+        "model": model,
+        "provider": provider,
+        "system_tokens": count_tokens(system_message) if system_message else 0,
+        "max_tokens": max_tokens,
+        "policy": policy,
+        "slot": slot,
+        "num_ctx": num_ctx,
+    }
@@ -27,7 +27,7 @@ def load_config(path="config.json"):
     with open(path, "r") as f:
         if ext == ".json":
             raw_config = json.load(f)
-        elif ext in ['.yaml', 'yml']:
+        elif ext in ['.yaml', '.yml']:
             raw_config = yaml.safe_load(f)
         else:
             raise ValueError(f"Unsupported config file format: {ext}")
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Keep surveillance off Gemini while a test runs fake teams."""
+    monkeypatch.setenv("API_KEY", "")
@@ -0,0 +1,215 @@
+from typing import Any, Dict, List, Optional, Union
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import (
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from token_counter import count_tokens
+
+POLICY_TYPES = ("last_turns", "last_tokens", "summarize")
+
+SUMMARY_SOURCE = "summary"
+SUMMARY_PROMPT = (
+    "You keep a running summary of a debate between agents solving a task. "
+    "Merge the new turns into the summary. Keep the latest answer, open "
+    "objections and decisions; drop repetition. Reply with the summary only."
+)
+
+
+def _text(message) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def _tokens(messages) -> int:
+    return sum(count_tokens(_text(message)) for message in messages)
+
+
+class PolicyContext(ChatCompletionContext):
+    """Base for the model contexts that trim what an agent is sent.
+
+    The context stores every message the agent sees, like autogen's
+    unbounded context, but ``get_messages`` returns only what the policy
+    keeps. The first message, which carries the task, is always kept.
+    Counters accumulate over the agent's lifetime, across resets, so a run
+    is measured by the difference between two ``stats()`` snapshots.
+    """
+
+    def __init__(self, initial_messages: Optional[List[LLMMessage]] = None):
+        super().__init__(initial_messages)
+        self.calls = 0
+        self.sent_tokens = 0
+        self.trimmed_tokens = 0
+        self.trimmed_messages = 0
+        self.summary_tokens = 0
+
+    def _window(self, messages: List[LLMMessage]) -> List[LLMMessage]:
+        """The messages after the task that the policy keeps."""
+        raise NotImplementedError
+
+    async def _prefix(self, dropped: List[LLMMessage]) -> List[LLMMessage]:
+        """Messages standing in for the dropped ones; none by default."""
+        return []
+
+    async def get_messages(self) -> List[LLMMessage]:
+        if not self._messages:
+            return []
+        head, rest = self._messages[:1], self._messages[1:]
+        window = self._window(rest)
+        # A function result can't come first without the call that produced it
+        while window and isinstance(window[0], FunctionExecutionResultMessage):
+            window = window[1:]
+        dropped = rest[: len(rest) - len(window)]
+        messages = head + (await self._prefix(dropped) if dropped else []) + window
+
+        sent = _tokens(messages)
+        self.calls += 1
+        self.sent_tokens += sent
+        self.trimmed_tokens += max(_tokens(self._messages) - sent, 0)
+        self.trimmed_messages += len(dropped)
+        return messages
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "sent_tokens": self.sent_tokens,
+            "trimmed_tokens": self.trimmed_tokens,
+            "trimmed_messages": self.trimmed_messages,
+            "summary_tokens": self.summary_tokens,
+        }
+
+
+class LastTurnsContext(PolicyContext):
+    """Sends the task and the last ``turns`` messages."""
+
+    def __init__(self, turns: int, initial_messages=None):
+        if turns <= 0:
+            raise ValueError("turns must be greater than 0")
+        super().__init__(initial_messages)
+        self.turns = turns
+
+    def _window(self, messages):
+        return messages[-self.turns :]
+
+
+class LastTokensContext(PolicyContext):
+    """Sends the task and the newest messages that fit in ``max_tokens``.
+
+    The task does not count against the budget, and the latest message is
+    always sent even if it alone is over.
+    """
+
+    def __init__(self, max_tokens: int, initial_messages=None):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be greater than 0")
+        super().__init__(initial_messages)
+        self.max_tokens = max_tokens
+
+    def _window(self, messages):
+        total = 0
+        start = len(messages)
+        while start > 0:
+            total += count_tokens(_text(messages[start - 1]))
+            if total > self.max_tokens and start < len(messages):
+                break
+            start -= 1
+        return messages[start:]
+
+
+class SummarizingContext(LastTurnsContext):
+    """Sends the task, a summary of older turns and the last ``turns`` messages.
+
+    The summary is kept up to date incrementally: each time more messages
+    fall out of the window, only those are folded into the previous summary
+    by ``model_client``, so every message is summarized once. If the
+    summarizer fails, older turns are dropped without a summary.
+    """
+
+    def __init__(self, model_client, turns: int, initial_messages=None):
+        super().__init__(turns, initial_messages)
+        self.model_client = model_client
+        self._summary = ""
+        self._summarized = 0
+
+    async def _prefix(self, dropped):
+        if len(dropped) > self._summarized:
+            await self._summarize(dropped[self._summarized :])
+            self._summarized = len(dropped)
+        if not self._summary:
+            return []
+        return [
+            UserMessage(
+                content=f"Summary of the earlier turns:\n{self._summary}",
+                source=SUMMARY_SOURCE,
+            )
+        ]
+
+    async def _summarize(self, messages):
+        turns = "\n\n".join(
+            f"{getattr(message, 'source', None) or 'assistant'}: {_text(message)}"
+            for message in messages
+        )
+        prompt = f"Summary so far:\n{self._summary or '(none)'}\n\nNew turns:\n{turns}"
+        try:
+            result = await self.model_client.create(
+                [
+                    SystemMessage(content=SUMMARY_PROMPT),
+                    UserMessage(content=prompt, source="user"),
+                ]
+            )
+        except Exception as e:
+            print(f"Context summary failed, dropping older turns: {e}")
+            return
+        if result.usage:
+            self.summary_tokens += (
+                result.usage.prompt_tokens + result.usage.completion_tokens
+            )
+        if isinstance(result.content, str):
+            self._summary = result.content.strip()
+
+    async def clear(self):
+        await super().clear()
+        self._summary = ""
+        self._summarized = 0
+
+
+def parse_context_policy(spec: Union[str, Dict[str, Any], None]) -> Optional[Dict]:
+    """Normalize a policy given as ``"last_turns:6"``, ``"last_tokens:2000"``,
+    ``"summarize:4"`` or a dict such as ``{"type": "summarize", "turns": 4,
+    "provider": "openai", "model": "gpt-4o-mini", "api_key": ...}``.
+
+    ``None`` (or ``"full"``) keeps the whole history.
+    """
+    if spec is None or spec == "full":
+        return None
+    if isinstance(spec, str):
+        kind, _, size = spec.partition(":")
+        if not size.isdigit():
+            raise ValueError(f"Invalid context policy: {spec}")
+        key = "max_tokens" if kind == "last_tokens" else "turns"
+        spec = {"type": kind, key: int(size)}
+    policy = dict(spec)
+    if policy.get("type") not in POLICY_TYPES:
+        raise ValueError(f"Unsupported context policy: {policy.get('type')}")
+    key = "max_tokens" if policy["type"] == "last_tokens" else "turns"
+    if not isinstance(policy.get(key), int):
+        raise ValueError(f"Context policy {policy['type']} needs an integer {key}")
+    return policy
+
+
+def build_context(policy: Optional[Dict], model_client=None) -> Optional[PolicyContext]:
+    """A fresh model context for one agent, or None to keep the full history.
+
+    ``model_client`` summarizes older turns for the ``summarize`` policy.
+    """
+    if policy is None:
+        return None
+    if policy["type"] == "last_turns":
+        return LastTurnsContext(policy["turns"])
+    if policy["type"] == "last_tokens":
+        return LastTokensContext(policy["max_tokens"])
+    return SummarizingContext(model_client, policy["turns"])
@@ -0,0 +1,285 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class ConversationStore(ABC):
+    """Interface for conversation transcripts.
+
+    A transcript is an append-only list of message dicts such as
+    ``{"source": "user", "content": "..."}``. Conversations that haven't
+    been written to for ``ttl`` seconds may be evicted; an expired
+    conversation is gone, so creating or appending to its id starts anew.
+    """
+
+    @abstractmethod
+    def create(self, conversation_id: str):
+        """Start an empty conversation; an existing one is kept."""
+
+    @abstractmethod
+    def exists(self, conversation_id: str) -> bool:
+        """Whether the conversation is stored and hasn't expired."""
+
+    @abstractmethod
+    def append(self, conversation_id: str, message: Dict):
+        """Add a message, creating the conversation if needed."""
+
+    def extend(self, conversation_id: str, messages: List[Dict]):
+        for message in messages:
+            self.append(conversation_id, message)
+
+    @abstractmethod
+    def read(
+        self, conversation_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Up to ``limit`` messages starting at index ``offset``."""
+
+    @abstractmethod
+    def count(self, conversation_id: str) -> int:
+        """How many messages the conversation has."""
+
+    def read_tail(self, conversation_id: str, limit: int) -> List[Dict]:
+        """The last ``limit`` messages of a conversation."""
+        offset = max(self.count(conversation_id) - limit, 0)
+        return self.read(conversation_id, offset, limit)
+
+    def evict_expired(self) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+
+class MemoryConversationStore(ConversationStore):
+    """Bounded in-memory LRU of conversations."""
+
+    def __init__(self, max_conversations: int = 1000, ttl: Optional[float] = None):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations = OrderedDict()
+        self._updated: Dict[str, float] = {}
+
+    def _touch(self, conversation_id: str):
+        self._conversations.move_to_end(conversation_id)
+        self._updated[conversation_id] = time.time()
+
+    def create(self, conversation_id: str):
+        if not self.exists(conversation_id):
+            self._conversations[conversation_id] = []
+        self._touch(conversation_id)
+        while len(self._conversations) > self.max_conversations:
+            oldest, _ = self._conversations.popitem(last=False)
+            self._updated.pop(oldest, None)
+
+    def exists(self, conversation_id: str) -> bool:
+        if conversation_id not in self._conversations:
+            return False
+        if self.ttl and time.time() - self._updated[conversation_id] > self.ttl:
+            del self._conversations[conversation_id]
+            del self._updated[conversation_id]
+            return False
+        return True
+
+    def append(self, conversation_id: str, message: Dict):
+        if not self.exists(conversation_id):
+            self.create(conversation_id)
+        self._conversations[conversation_id].append(message)
+        self._touch(conversation_id)
+
+    def read(self, conversation_id, offset=0, limit=None):
+        messages = self._conversations.get(conversation_id, [])
+        end = None if limit is None else offset + limit
+        return list(messages[offset:end])
+
+    def count(self, conversation_id: str) -> int:
+        return len(self._conversations.get(conversation_id, []))
+
+    def evict_expired(self) -> int:
+        if not self.ttl:
+            return 0
+        now = time.time()
+        expired = [
+            conversation_id
+            for conversation_id, updated in self._updated.items()
+            if now - updated > self.ttl
+        ]
+        for conversation_id in expired:
+            del self._conversations[conversation_id]
+            del self._updated[conversation_id]
+        return len(expired)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversations in an on-disk SQLite database in WAL mode.
+
+    Several app processes can share one database file. Each append is a
+    single indexed insert, and reads are paginated by message sequence
+    number.
+    """
+
+    def __init__(
+        self, path: str = "palette_conversations.db", ttl: Optional[float] = None
+    ):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL,
+                length INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS conversations_updated_at
+                ON conversations (updated_at);
+            """)
+
+    def _delete_if_expired(self, conversation_id: str) -> bool:
+        """Drop the conversation if it outlived ``ttl``, so it starts over
+        instead of coming back. Call inside a transaction."""
+        if not self.ttl:
+            return False
+        deleted = self._db.execute(
+            "DELETE FROM conversations WHERE id = ? AND updated_at < ?",
+            (conversation_id, time.time() - self.ttl),
+        ).rowcount
+        if deleted:
+            self._db.execute(
+                "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+            )
+        return bool(deleted)
+
+    def create(self, conversation_id: str):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_if_expired(conversation_id)
+                self._db.execute(
+                    "INSERT OR IGNORE INTO conversations (id, updated_at) VALUES (?, ?)",
+                    (conversation_id, time.time()),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None:
+                return False
+            if not (self.ttl and time.time() - row[0] > self.ttl):
+                return True
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_if_expired(conversation_id)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return False
+
+    def append(self, conversation_id: str, message: Dict):
+        self.extend(conversation_id, [message])
+
+    def extend(self, conversation_id: str, messages: List[Dict]):
+        if not messages:
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_if_expired(conversation_id)
+                self._db.execute(
+                    "INSERT OR IGNORE INTO conversations (id, updated_at) VALUES (?, ?)",
+                    (conversation_id, time.time()),
+                )
+                (length,) = self._db.execute(
+                    "UPDATE conversations SET length = length + ?, updated_at = ? "
+                    "WHERE id = ? RETURNING length",
+                    (len(messages), time.time(), conversation_id),
+                ).fetchone()
+                start = length - len(messages)
+                self._db.executemany(
+                    "INSERT INTO messages (conversation_id, seq, data) VALUES (?, ?, ?)",
+                    [
+                        (conversation_id, start + i, json.dumps(message))
+                        for i, message in enumerate(messages)
+                    ],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def read(self, conversation_id, offset=0, limit=None):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM messages WHERE conversation_id = ? AND seq >= ? "
+                "ORDER BY seq LIMIT ?",
+                (conversation_id, offset, -1 if limit is None else limit),
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def count(self, conversation_id: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT length FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def evict_expired(self) -> int:
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "DELETE FROM messages WHERE conversation_id IN "
+                    "(SELECT id FROM conversations WHERE updated_at < ?)",
+                    (cutoff,),
+                )
+                evicted = self._db.execute(
+                    "DELETE FROM conversations WHERE updated_at < ?", (cutoff,)
+                ).rowcount
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def store_from_env() -> ConversationStore:
+    """Build the conversation store selected by PALETTE_STORE."""
+    ttl = os.getenv("PALETTE_CONVERSATION_TTL")
+    ttl = float(ttl) if ttl else None
+    if os.getenv("PALETTE_STORE", "memory") == "sqlite":
+        return SQLiteConversationStore(
+            os.getenv("PALETTE_STORE_PATH", "palette_conversations.db"), ttl=ttl
+        )
+    return MemoryConversationStore(
+        max_conversations=int(os.getenv("PALETTE_MAX_CONVERSATIONS", "1000")),
+        ttl=ttl,
+    )
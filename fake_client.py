@@ -0,0 +1,176 @@
+import asyncio
+import random
+from typing import Any, List, Mapping, Optional, Sequence
+from urllib.parse import parse_qsl
+
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    ModelInfo,
+    RequestUsage,
+    SystemMessage,
+)
+
+from token_counter import count_tokens
+
+# Replies cycled by turn; distinct enough not to look like a loop
+DEFAULT_RESPONSES = [
+    """class Solution {
+public:
+    vector<int> twoSum(vector<int>& nums, int target) {
+        unordered_map<int, int> seen;
+        for (int i = 0; i < nums.size(); ++i) {
+            if (seen.count(target - nums[i])) return {seen[target - nums[i]], i};
+            seen[nums[i]] = i;
+        }
+        return {};
+    }
+};""",
+    "The solution misses the case where the input is empty. Add a guard before the loop and return early.",
+    """ListNode* reverseList(ListNode* head) {
+    ListNode* prev = nullptr;
+    while (head) {
+        ListNode* next = head->next;
+        head->next = prev;
+        prev = head;
+        head = next;
+    }
+    return prev;
+}""",
+    "Complexity looks fine, but please rename the variables and explain why a hash map beats sorting here.",
+]
+
+
+def _text(message) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+class FakeChatCompletionClient(ChatCompletionClient):
+    """Deterministic offline model client for tests and benchmarks.
+
+    The reply depends only on the request, so one client can be shared by
+    several agents. The turn number is the count of non-system messages in
+    the request. Replies cycle through ``responses``, or through a few
+    canned answers and reviews by default. With ``approve_after=k``, the
+    client answers ``approve_text`` once a request carries at least ``k``
+    messages.
+    ``latency`` (plus up to ``jitter`` seconds, seeded per turn) simulates
+    network and inference time. Usage is reported with the local token
+    counter.
+    """
+
+    def __init__(
+        self,
+        model: str = "fake",
+        responses: Optional[List[str]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        approve_after: Optional[int] = None,
+        approve_text: str = "APPROVE",
+        seed: int = 0,
+    ):
+        self.model = model
+        self.responses = list(responses or DEFAULT_RESPONSES)
+        self.latency = latency
+        self.jitter = jitter
+        self.approve_after = approve_after
+        self.approve_text = approve_text
+        self.seed = seed
+        self.calls = 0
+        self._last_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    @classmethod
+    def from_model_name(cls, model_name: str) -> "FakeChatCompletionClient":
+        """Build a client from a spec such as ``"critic?approve_after=3&latency=0.05"``.
+
+        ``responses`` takes ``|``-separated replies.
+        """
+        name, _, query = model_name.partition("?")
+        options = dict(parse_qsl(query))
+        kwargs = {"model": name}
+        if "responses" in options:
+            kwargs["responses"] = options["responses"].split("|")
+        for option in ("latency", "jitter"):
+            if option in options:
+                kwargs[option] = float(options[option])
+        for option in ("approve_after", "seed"):
+            if option in options:
+                kwargs[option] = int(options[option])
+        if "approve_text" in options:
+            kwargs["approve_text"] = options["approve_text"]
+        return cls(**kwargs)
+
+    def _reply(self, turn: int) -> str:
+        if self.approve_after is not None and turn >= self.approve_after:
+            return self.approve_text
+        return self.responses[turn % len(self.responses)]
+
+    async def create(
+        self,
+        messages: Sequence,
+        *,
+        tools: Sequence = [],
+        tool_choice: Any = "auto",
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token=None,
+    ) -> CreateResult:
+        turn = sum(1 for message in messages if not isinstance(message, SystemMessage))
+        delay = self.latency
+        if self.jitter:
+            delay += random.Random(self.seed * 1000003 + turn).uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        content = self._reply(turn)
+        usage = RequestUsage(
+            prompt_tokens=sum(count_tokens(_text(message)) for message in messages),
+            completion_tokens=count_tokens(content),
+        )
+        self.calls += 1
+        self._last_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens
+            + usage.completion_tokens,
+        )
+        return CreateResult(
+            finish_reason="stop", content=content, usage=usage, cached=False
+        )
+
+    async def create_stream(self, messages: Sequence, **kwargs):
+        result = await self.create(messages, **kwargs)
+        for word in result.content.split(" "):
+            yield word + " "
+        yield result
+
+    async def close(self):
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._last_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return sum(count_tokens(_text(message)) for message in messages)
+
+    def remaining_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return max(128000 - self.count_tokens(messages), 0)
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return ModelInfo(
+            vision=False,
+            function_calling=False,
+            json_output=False,
+            family="unknown",
+            structured_output=False,
+        )
+
+    @property
+    def capabilities(self):
+        return self.model_info
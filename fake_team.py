@@ -0,0 +1,40 @@
+"""An offline team on the "fake" provider, for benchmarks and tests.
+
+Importing this module has no side effects; build the team with
+``Palette(config=fake_team_config(...))``.
+"""
+
+FAKE_TEAM = {
+    "provider_1": "fake",
+    "provider_2": "fake",
+    "provider_3": "fake",
+    "provider_4": "fake",
+    "agent_1": "coder",
+    "agent_2": "tester?approve_after={approve_after}",
+    "agent_3": "tester?approve_after={approve_after}",
+    "agent_4": "tester?approve_after={approve_after}",
+    "description_1": "Answers the coding problem.",
+    "description_2": "Reviews the answer.",
+    "description_3": "Reviews the answer.",
+    "description_4": "Reviews the answer.",
+    "termination_text": "APPROVE",
+    "token_threshold": 100000,
+}
+
+QUESTION = "Given an array of integers nums and an integer target, return indices of the two numbers such that they add up to target."
+
+
+def fake_team_config(approve_after=5, latency=0.0):
+    config = {
+        key: (
+            value.format(approve_after=approve_after)
+            if isinstance(value, str)
+            else value
+        )
+        for key, value in FAKE_TEAM.items()
+    }
+    if latency:
+        for n in range(1, 5):
+            separator = "&" if "?" in config[f"agent_{n}"] else "?"
+            config[f"agent_{n}"] += f"{separator}latency={latency}"
+    return config
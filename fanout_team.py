@@ -0,0 +1,157 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import TextMessage
+from autogen_core import CancellationToken
+
+
+class FanoutTeam:
+    """Team where the reviewers work on the primary answer in parallel.
+
+    Each round the primary agent answers (the task first, then the
+    reviewers' feedback) and every reviewer reviews that answer
+    concurrently. Reviews are streamed in the order they finish, so a
+    round takes about as long as the slowest reviewer rather than the sum
+    of all of them. The termination condition is checked as each review
+    arrives; once it fires, reviews still in flight are cancelled.
+
+    With a ``quorum`` (a ``QuorumTermination`` that is also part of the
+    termination condition), outstanding reviews are cancelled as soon as
+    the round can no longer be approved, and the quorum's time budget is
+    checked even while no review arrives.
+
+    Exposes the ``run_stream``/``reset`` interface of autogen's
+    ``RoundRobinGroupChat`` so ``Palette`` can use either.
+    """
+
+    def __init__(
+        self,
+        participants: List,
+        termination_condition=None,
+        max_rounds: Optional[int] = None,
+        quorum=None,
+    ):
+        if len(participants) < 2:
+            raise ValueError("A fan-out team needs a primary agent and a reviewer")
+        self.primary = participants[0]
+        self.reviewers = list(participants[1:])
+        self.termination_condition = termination_condition
+        self.max_rounds = max_rounds
+        self.quorum = quorum
+        self.last_votes: Dict[str, str] = {}
+
+    async def _review(self, reviewer, messages, cancellation_token):
+        response = await reviewer.on_messages(messages, cancellation_token)
+        return reviewer, response
+
+    def _until_deadline(self) -> Optional[float]:
+        if self.quorum is None or self.quorum.deadline() is None:
+            return None
+        remaining = self.quorum.deadline() - time.monotonic()
+        # Past the deadline only a new review can change the decision
+        return remaining if remaining > 0 else None
+
+    async def _check_termination(self, messages):
+        if self.termination_condition is None:
+            return None
+        return await self.termination_condition(messages)
+
+    async def run_stream(self, task: str, cancellation_token=None):
+        """Yield every message of the run, then a ``TaskResult``."""
+        cancellation_token = cancellation_token or CancellationToken()
+
+        task_message = TextMessage(source="user", content=task)
+        transcript = [task_message]
+        yield task_message
+
+        stop_reason = None
+        primary_input = [task_message]
+        reviewer_input = {reviewer.name: [task_message] for reviewer in self.reviewers}
+        rounds = 0
+
+        while True:
+            response = await self.primary.on_messages(primary_input, cancellation_token)
+            for inner in response.inner_messages or []:
+                yield inner
+            answer = response.chat_message
+            transcript.append(answer)
+            yield answer
+
+            stop = await self._check_termination([answer])
+            if stop is not None:
+                stop_reason = stop.content
+                break
+
+            pending = {
+                asyncio.ensure_future(
+                    self._review(
+                        reviewer,
+                        reviewer_input[reviewer.name] + [answer],
+                        cancellation_token,
+                    )
+                )
+                for reviewer in self.reviewers
+            }
+            reviews = []
+            self.last_votes = {}
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=self._until_deadline(),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        # The quorum's time budget ran out; re-check it
+                        stop = await self._check_termination([])
+                    for finished in done:
+                        reviewer, review = finished.result()
+                        for inner in review.inner_messages or []:
+                            yield inner
+                        reviews.append(review.chat_message)
+                        self.last_votes[reviewer.name] = review.chat_message.content
+                        transcript.append(review.chat_message)
+                        yield review.chat_message
+                        stop = await self._check_termination([review.chat_message])
+                        if stop is not None:
+                            break
+                    if stop is not None:
+                        break
+                    if self.quorum is not None and self.quorum.rejected(len(pending)):
+                        break
+            finally:
+                # Nobody reads these reviews any more; stop paying for them
+                for future in pending:
+                    future.cancel()
+
+            rounds += 1
+            if stop is not None:
+                stop_reason = stop.content
+                break
+            if self.max_rounds is not None and rounds >= self.max_rounds:
+                stop_reason = f"Maximum number of rounds {self.max_rounds} reached."
+                break
+
+            primary_input = reviews
+            reviewer_input = {reviewer.name: [] for reviewer in self.reviewers}
+
+        if self.termination_condition is not None:
+            await self.termination_condition.reset()
+        yield TaskResult(messages=transcript, stop_reason=stop_reason)
+
+    async def run(self, task: str, cancellation_token=None) -> TaskResult:
+        result = None
+        async for message in self.run_stream(task, cancellation_token):
+            result = message
+        return result
+
+    async def reset(self):
+        """Clear every agent's history and the termination condition."""
+        token = CancellationToken()
+        await self.primary.on_reset(token)
+        for reviewer in self.reviewers:
+            await reviewer.on_reset(token)
+        if self.termination_condition is not None:
+            await self.termination_condition.reset()
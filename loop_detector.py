@@ -0,0 +1,189 @@
+import random
+import re
+from collections import deque
+from typing import Deque, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+_MASK = (1 << 64) - 1
+_WORD = re.compile(r"\w+")
+
+
+class LoopVerdict(NamedTuple):
+    """What the detector concluded after one message.
+
+    ``loop`` is set when the last ``period`` messages repeat the cycle
+    before them. ``suspect`` marks a cycle whose messages are only
+    borderline similar, worth a second opinion.
+    """
+
+    loop: bool
+    suspect: bool
+    period: Optional[int]
+    similarity: float
+
+
+NO_LOOP = LoopVerdict(False, False, None, 0.0)
+
+
+class LoopDetector:
+    """Streaming detector of conversations that go round in circles.
+
+    Each message is fingerprinted once, when it arrives, with a one-hash
+    MinHash over its word shingles. Signatures are split into LSH bands,
+    and a band index over the last ``max_period`` messages finds the
+    earlier messages that may resemble the new one without comparing it
+    against all of them. Candidates are compared by signature, or exactly
+    when both messages are short.
+
+    A cycle of period ``p`` (A->B->A, A->B->C->A, ...) is reported once
+    each of the last ``p`` messages (at least two) came from the same
+    agent as the message ``p`` turns before it, with an estimated
+    Jaccard similarity of at least ``threshold``. Cycles whose similarity
+    falls within ``margin`` below the threshold are reported as suspect.
+    """
+
+    def __init__(
+        self,
+        max_period: int = 6,
+        threshold: float = 0.7,
+        margin: float = 0.15,
+        num_perm: int = 64,
+        bands: int = 32,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_period = max_period
+        self.threshold = threshold
+        self.margin = margin
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Spreads Python's (per-process) tuple hash over the slots; signatures
+        # are only ever compared within one process
+        rng = random.Random(seed)
+        self._a = rng.getrandbits(64) | 1
+        self._b = rng.getrandbits(64)
+        self.reset()
+
+    def reset(self):
+        """Forget every message seen so far."""
+        self._position = 0
+        self._window: Deque[Tuple[int, List]] = deque()
+        self._index: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._fingerprints: Dict[int, Tuple[str, Tuple]] = {}
+        # Per period, how similar the latest messages were to the ones a
+        # period before them; a full cycle's worth decides
+        self._history = [
+            deque(maxlen=max(period, 2)) for period in range(self.max_period + 1)
+        ]
+        self.comparisons = 0
+
+    def shingles(self, text: str) -> FrozenSet[int]:
+        """Hashes of ``text``'s word shingles."""
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        if len(words) < size:
+            return frozenset([hash(tuple(words))])
+        return frozenset(
+            hash(tuple(words[i : i + size])) for i in range(len(words) - size + 1)
+        )
+
+    def signature(self, shingles: FrozenSet[int]) -> Tuple[int, ...]:
+        """One-permutation MinHash of a set of shingle hashes."""
+        slots = [None] * self.num_perm
+        for shingle in shingles:
+            value = (shingle * self._a + self._b) & _MASK
+            slot = value % self.num_perm
+            value >>= 8
+            if slots[slot] is None or value < slots[slot]:
+                slots[slot] = value
+        # Fill each empty slot from the next filled one around the ring, so
+        # short texts compare fairly
+        signature = list(slots)
+        donor = None
+        for i in reversed(range(2 * self.num_perm)):
+            slot = i % self.num_perm
+            if slots[slot] is not None:
+                donor = slot
+            elif i < self.num_perm and donor is not None:
+                signature[slot] = slots[donor] + (donor - slot) % self.num_perm
+        if donor is None:
+            return tuple([0] * self.num_perm)
+        return tuple(signature)
+
+    def similarity(self, first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(a == b for a, b in zip(first, second)) / self.num_perm
+
+    def _similarity(self, first, second) -> float:
+        # Short messages fill few slots and make a noisy estimate, but their
+        # shingle sets are small enough to compare exactly
+        first_signature, first_shingles = first
+        second_signature, second_shingles = second
+        if first_shingles is not None and second_shingles is not None:
+            union = len(first_shingles | second_shingles)
+            return len(first_shingles & second_shingles) / union if union else 1.0
+        return self.similarity(first_signature, second_signature)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [
+            (band, signature[band * rows : (band + 1) * rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, source: str, text: str) -> LoopVerdict:
+        """Record one message and report whether the conversation is looping."""
+        position = self._position
+        self._position += 1
+        shingles = self.shingles(text)
+        signature = self.signature(shingles)
+        keys = self._band_keys(signature)
+        fingerprint = (
+            signature,
+            shingles if len(shingles) <= self.num_perm else None,
+        )
+
+        # Earlier messages sharing a band are the only ones worth comparing
+        candidates = set()
+        for key in keys:
+            candidates.update(self._index.get(key, ()))
+        matches = {}
+        for earlier in candidates:
+            period = position - earlier
+            earlier_source, earlier_fingerprint = self._fingerprints[earlier]
+            if period > self.max_period or earlier_source != source:
+                continue
+            self.comparisons += 1
+            matches[period] = self._similarity(fingerprint, earlier_fingerprint)
+
+        verdict = NO_LOOP
+        for period in range(1, self.max_period + 1):
+            history = self._history[period]
+            history.append(matches.get(period, 0.0))
+            if verdict.loop or len(history) < history.maxlen:
+                continue
+            lowest = min(history)
+            if lowest >= self.threshold:
+                verdict = LoopVerdict(True, False, period, lowest)
+            elif lowest >= self.threshold - self.margin and not verdict.suspect:
+                verdict = LoopVerdict(False, True, period, lowest)
+
+        self._remember(position, source, fingerprint, keys)
+        return verdict
+
+    def _remember(self, position, source, fingerprint, keys):
+        self._fingerprints[position] = (source, fingerprint)
+        for key in keys:
+            self._index.setdefault(key, []).append(position)
+        self._window.append((position, keys))
+        while self._window and self._window[0][0] <= position - self.max_period:
+            old, old_keys = self._window.popleft()
+            del self._fingerprints[old]
+            for key in old_keys:
+                positions = self._index[key]
+                positions.remove(old)
+                if not positions:
+                    del self._index[key]
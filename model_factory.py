@@ -1,39 +1,406 @@
-from autogen_ext.models.ollama import OllamaChatCompletionClient
-from autogen_ext.models.openai import OpenAIChatCompletionClient, AzureOpenAIChatCompletionClient
-from semantic_kernel.connectors.ai.anthropic import AnthropicChatCompletion
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+
+from autogen_core.models import ChatCompletionClient, RequestUsage
+
+# Provider SDKs are imported in _build_model_client, on first use: together
+# they take seconds to import and a deployment usually needs one of them
 
 class ModelProvider:
     OLLAMA = "ollama"
     OPENAI = "openai"
     AZURE_OPENAI = "azure_openai"
     ANTHROPIC = "anthropic"
+    # Offline scripted client for tests and benchmarks, see fake_client.py
+    FAKE = "fake"
+
+# Open connections allowed per provider, shared by every client of that provider
+MAX_CONNECTIONS = int(os.getenv("PALETTE_MAX_CONNECTIONS", "20"))
+
+_loop_ids = weakref.WeakKeyDictionary()
+_loops = {}
+_loop_counter = itertools.count(1)
+_loop_lock = threading.Lock()
+
+
+def current_loop_id():
+    """A number naming the running event loop, or None outside of one.
+
+    Unlike ``id(loop)`` it is never handed to a later loop, so a client
+    keyed by it can't be mistaken for one of a new ``asyncio.run``.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    with _loop_lock:
+        loop_id = _loop_ids.get(loop)
+        if loop_id is None:
+            loop_id = _loop_ids[loop] = next(_loop_counter)
+            _loops[loop_id] = weakref.ref(loop)
+        return loop_id
+
+
+def _loop_alive(loop_id):
+    if loop_id is None:
+        return True
+    with _loop_lock:
+        ref = _loops.get(loop_id)
+    loop = ref() if ref is not None else None
+    if loop is None or loop.is_closed():
+        with _loop_lock:
+            _loops.pop(loop_id, None)
+        return False
+    return True
+
+
+class ClientRegistry:
+    """Shared model clients, reference counted.
+
+    Clients are keyed by (provider, model, endpoint, key hash, max_tokens)
+    plus any Ollama options, so every team asking for the same model gets the same client and its
+    warm keep-alive connections. OpenAI and Azure clients of one provider
+    also share one HTTP connection pool capped at ``max_connections``.
+
+    Connections belong to the event loop that opened them, so clients and
+    pools are also keyed by the running loop (see ``current_loop_id``): a
+    second ``asyncio.run`` gets its own instead of the closed loop's.
+
+    A client whose last reference is released stays open as idle, so the
+    next team built for it reuses it; ``close_idle`` shuts down clients
+    that have been idle for too long, and drops those of closed loops.
+    """
+
+    def __init__(self, max_connections: int = MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._entries = {}
+        self._keys = {}
+        self._http_clients = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "closed": 0}
+
+    @staticmethod
+    def key(provider, model_name, end_point, api_key, max_tokens, loop=None, **extra):
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        extra = json.dumps(extra, sort_keys=True, default=str) if extra else None
+        return provider, model_name, end_point, key_hash, max_tokens, extra, loop
+
+    def http_client(self, provider, loop=None):
+        """The connection-capped HTTP client shared by ``provider``'s clients on ``loop``."""
+        import httpx
+        from openai import DefaultAsyncHttpxClient
+
+        with self._lock:
+            client = self._http_clients.get((provider, loop))
+            if client is None or client.is_closed:
+                client = DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    )
+                )
+                self._http_clients[(provider, loop)] = client
+            return client
 
-def get_model_client(provider:str, model_name:str, end_point:str="that was not neccessary", api_key:str="that was not neccessary", max_tokens=10):
+    def acquire(self, key, factory):
+        """Return the client for ``key``, building it with ``factory`` if needed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["refs"] += 1
+                entry["idle_since"] = None
+                self._stats["reused"] += 1
+                return entry["client"]
+
+        client = factory()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread built the same client first; use theirs
+                entry["refs"] += 1
+                entry["idle_since"] = None
+                self._stats["reused"] += 1
+                return entry["client"]
+            self._entries[key] = {"client": client, "refs": 1, "idle_since": None}
+            self._keys[id(client)] = key
+            self._stats["created"] += 1
+            return client
+
+    def release(self, client):
+        """Drop one reference to ``client``; unknown clients are ignored."""
+        with self._lock:
+            key = self._keys.get(id(client))
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry["refs"] = max(entry["refs"] - 1, 0)
+            if entry["refs"] == 0:
+                entry["idle_since"] = time.monotonic()
+
+    async def _close_client(self, key, client):
+        # OpenAI clients close the HTTP client they were given, which is the
+        # shared pool, so they're simply dropped
+        if key[0] in (ModelProvider.OPENAI, ModelProvider.AZURE_OPENAI):
+            return
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                print(f"Error closing model client {key[1]}: {e}")
+
+    async def _close_http_client(self, http_client):
+        try:
+            await http_client.aclose()
+        except Exception as e:
+            print(f"Error closing HTTP pool: {e}")
+
+    async def close_idle(self, max_idle: float = 300.0) -> int:
+        """Close clients unreferenced for ``max_idle`` seconds; returns how many.
+
+        Clients and pools of closed event loops are dropped whatever their
+        references, since nothing can use them any more.
+        """
+        now = time.monotonic()
+        with self._lock:
+            loops = {key[-1] for key in self._entries} | {
+                loop for _, loop in self._http_clients
+            }
+        dead = {loop for loop in loops if not _loop_alive(loop)}
+        with self._lock:
+            expired = [
+                key
+                for key, entry in self._entries.items()
+                if key[-1] in dead
+                or entry["idle_since"] is not None
+                and now - entry["idle_since"] >= max_idle
+            ]
+            clients = [(key, self._entries.pop(key)["client"]) for key in expired]
+            for _, client in clients:
+                self._keys.pop(id(client), None)
+            self._stats["closed"] += len(clients)
+            pools = [key for key in self._http_clients if key[1] in dead]
+            http_clients = [self._http_clients.pop(key) for key in pools]
+
+        for key, client in clients:
+            # Closing needs the loop that opened the connections
+            if key[-1] not in dead:
+                await self._close_client(key, client)
+        for http_client in http_clients:
+            await self._close_http_client(http_client)
+        return len(clients)
+
+    async def close_all(self):
+        """Close every client and the shared HTTP pools."""
+        with self._lock:
+            clients = [(key, entry["client"]) for key, entry in self._entries.items()]
+            http_clients = list(self._http_clients.values())
+            self._entries = {}
+            self._keys = {}
+            self._http_clients = {}
+            self._stats["closed"] += len(clients)
+
+        for key, client in clients:
+            await self._close_client(key, client)
+        for http_client in http_clients:
+            await self._close_http_client(http_client)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "clients": len(self._entries),
+                "idle": sum(
+                    1 for entry in self._entries.values() if entry["refs"] == 0
+                ),
+                "max_connections": self.max_connections,
+            }
+
+
+client_registry = ClientRegistry()
+
+
+def ollama_options(keep_alive=None, num_ctx=None, num_keep=None, options=None):
+    """Create args that let Ollama reuse a prompt prefix across calls.
+
+    ``keep_alive`` keeps the model (and its KV cache) loaded between turns
+    and requests. A fixed ``num_ctx`` avoids reloading the model when the
+    context size would otherwise change, and ``num_keep`` pins that many
+    leading prompt tokens (the system message) when the context shifts.
+    """
+    create_args = {}
+    if keep_alive is not None:
+        create_args["keep_alive"] = keep_alive
+    merged = dict(options or {})
+    if num_ctx is not None:
+        merged["num_ctx"] = num_ctx
+    if num_keep is not None:
+        merged["num_keep"] = num_keep
+    if merged:
+        create_args["options"] = merged
+    return create_args
+
+def _check_client_args(provider, end_point, api_key):
+    """Fail fast on settings that could never build a client."""
+    if provider in (ModelProvider.OPENAI, ModelProvider.ANTHROPIC):
+        if not api_key:
+            raise ValueError("you did'nt add correct end_point or api_key")
+    elif provider == ModelProvider.AZURE_OPENAI:
+        if not end_point or api_key:
+            raise ValueError("you did'nt add correct end_point or api_key")
+    elif provider not in (ModelProvider.OLLAMA, ModelProvider.FAKE):
+        raise ValueError(f"Unsupported provider: {provider}")
+
+def _build_model_client(provider, model_name, end_point, api_key, max_tokens, ollama_args=None, loop=None):
+    _check_client_args(provider, end_point, api_key)
     if provider == ModelProvider.OLLAMA:
-        return OllamaChatCompletionClient(model=model_name, max_tokens=max_tokens)
+        from autogen_ext.models.ollama import OllamaChatCompletionClient
+        return OllamaChatCompletionClient(model=model_name, max_tokens=max_tokens, **(ollama_args or {}))
     elif provider == ModelProvider.OPENAI:
-        if not api_key: 
-            raise ValueError("you did'nt add correct end_point or api_key")
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
         return OpenAIChatCompletionClient(
             model=model_name,
             api_key = api_key,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            http_client=client_registry.http_client(provider, loop),
         )
     elif provider == ModelProvider.AZURE_OPENAI:
-        if not end_point or api_key: 
-            raise ValueError("you did'nt add correct end_point or api_key")
+        from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
         return AzureOpenAIChatCompletionClient(
-                model=model_name, 
+                model=model_name,
                 azure_endpoint=end_point,
                 api_key=api_key,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                http_client=client_registry.http_client(provider, loop),
             )
-    elif provider == ModelProvider.ANTHROPIC:
-        if not api_key: 
-            raise ValueError("you did'nt add correct end_point or api_key")
+    elif provider == ModelProvider.FAKE:
+        from fake_client import FakeChatCompletionClient
+        return FakeChatCompletionClient.from_model_name(model_name)
+    else:
+        from semantic_kernel.connectors.ai.anthropic import AnthropicChatCompletion
         return AnthropicChatCompletion(
             model=model_name,
             max_tokens=max_tokens
         )
+
+
+class LazyModelClient(ChatCompletionClient):
+    """Stands in for a shared model client until the agent's first turn.
+
+    Building a team then costs no SDK imports or client construction; the
+    real client is fetched from the registry on the first ``create`` and
+    used from then on. ``release`` gives it back. Used from another event
+    loop, e.g. by a second ``asyncio.run``, it swaps the client for that
+    loop's.
+    """
+
+    def __init__(self, provider, model_name, **client_args):
+        self.provider = provider
+        self.model_name = model_name
+        self._client_args = client_args
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self):
+        loop = current_loop_id()
+        if self._client is not None and loop is not None and loop != self._loop:
+            self.release()
+        if self._client is None:
+            self._client = _shared_model_client(self.provider, self.model_name, loop, **self._client_args)
+            self._loop = loop
+        return self._client
+
+    @property
+    def built(self):
+        return self._client is not None
+
+    async def create(self, messages, **kwargs):
+        return await self.client.create(messages, **kwargs)
+
+    async def create_stream(self, messages, **kwargs):
+        async for chunk in self.client.create_stream(messages, **kwargs):
+            yield chunk
+
+    def release(self):
+        if self._client is not None:
+            release_model_client(self._client)
+            self._client = None
+
+    async def close(self):
+        # The registry owns the real client; closing the proxy only lets go of it
+        self.release()
+
+    def actual_usage(self):
+        if self._client is None:
+            return RequestUsage(prompt_tokens=0, completion_tokens=0)
+        return self._client.actual_usage()
+
+    def total_usage(self):
+        if self._client is None:
+            return RequestUsage(prompt_tokens=0, completion_tokens=0)
+        return self._client.total_usage()
+
+    def count_tokens(self, messages, **kwargs):
+        return self.client.count_tokens(messages, **kwargs)
+
+    def remaining_tokens(self, messages, **kwargs):
+        return self.client.remaining_tokens(messages, **kwargs)
+
+    @property
+    def model_info(self):
+        return self.client.model_info
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    def __getattr__(self, name):
+        # Provider-specific methods (get_create_args, ...) need the real client
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+def get_model_client(provider:str, model_name:str, end_point:str="that was not neccessary", api_key:str="that was not neccessary", max_tokens=10, keep_alive=None, num_ctx=None, num_keep=None, options=None, lazy=False):
+    """Return a shared client for the model; pair with ``release_model_client``.
+
+    ``keep_alive``, ``num_ctx``, ``num_keep`` and ``options`` only apply to
+    Ollama; see ``ollama_options``. With ``lazy`` the settings are checked
+    now but the client is only built on first use, see ``LazyModelClient``.
+    Outside an event loop the client is always lazy, so that it is bound to
+    the loop it ends up running on.
+    """
+    loop = current_loop_id()
+    if lazy or loop is None:
+        _check_client_args(provider, end_point, api_key)
+        return LazyModelClient(
+            provider, model_name, end_point=end_point, api_key=api_key, max_tokens=max_tokens,
+            keep_alive=keep_alive, num_ctx=num_ctx, num_keep=num_keep, options=options,
+        )
+    return _shared_model_client(
+        provider, model_name, loop, end_point, api_key, max_tokens, keep_alive, num_ctx, num_keep, options,
+    )
+
+def _shared_model_client(provider, model_name, loop, end_point, api_key, max_tokens, keep_alive=None, num_ctx=None, num_keep=None, options=None):
+    ollama_args = None
+    if provider == ModelProvider.OLLAMA:
+        ollama_args = ollama_options(keep_alive, num_ctx, num_keep, options)
+    key = client_registry.key(provider, model_name, end_point, api_key, max_tokens, loop, **(ollama_args or {}))
+    return client_registry.acquire(
+        key,
+        lambda: _build_model_client(provider, model_name, end_point, api_key, max_tokens, ollama_args, loop),
+    )
+
+def release_model_client(client):
+    """Give back a client obtained from ``get_model_client``."""
+    if isinstance(client, LazyModelClient):
+        client.release()
     else:
-        raise ValueError(f"Unsupported provider: {provider}")
+        client_registry.release(client)
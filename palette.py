@@ -1,30 +1,76 @@
 import asyncio
 import os
-import threading
 import time
+from collections import deque
 from typing import Any, Dict, List, Optional
 
-import google.generativeai as genai
-import tiktoken
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import ExternalTermination, TextMentionTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
+from autogen_core import CancellationToken
 from dotenv import load_dotenv
-from google.generativeai.types import HarmBlockThreshold, HarmCategory
 
-from model_factory import get_model_client
+from batch_runner import arun_batch
+from budget_planner import BudgetPlan, BudgetPlanner, agent_profile
+from context_policy import build_context, parse_context_policy
+from fanout_team import FanoutTeam
+from loop_detector import LoopDetector
+from model_factory import (
+    ModelProvider,
+    current_loop_id,
+    get_model_client,
+    release_model_client,
+)
+from pattern_matcher import PatternMatcher
+from quorum import ApprovalTermination, QuorumTermination, TurnLimitTermination
+from result_cache import cache_key
+from ring_buffer import RingBuffer, SurveillanceRecord, format_record
+from suggestion_service import SuggestionService, default_suggestion_service
+from token_counter import TokenLedger, count_tokens
 
 load_dotenv()
 
 
+class InputRejectedError(ValueError):
+    """The input failed the pre-run token check."""
+
+
 class SurveillanceAgent:
-    def __init__(self, palette, gemini_api_key=os.getenv("API_KEY")):
+    def __init__(
+        self,
+        palette,
+        gemini_api_key: Optional[str] = None,
+        suggestion_service: Optional[SuggestionService] = None,
+        log_capacity: int = 100,
+        history_capacity: int = 100,
+        error_patterns: Optional[Dict[str, List[str]]] = None,
+        loop_max_period: int = 6,
+        loop_threshold: float = 0.7,
+    ):
         self.palette = palette
         self.monitoring_active = False
-        self.background_thread = None
+        self.suggestions = suggestion_service or default_suggestion_service
+        # Outbound AI calls made by this agent vs. model calls it observed;
+        # monitoring may never call the AI more often than the team does.
+        self._ai_calls = 0
+        self._workload_calls = 0
+        self.last_status = {
+            "status": "ok",
+            "message": "No active conversation to monitor",
+        }
+        # Fingerprints each message once and spots cycles of up to
+        # loop_max_period turns
+        self.loop_detector = LoopDetector(
+            max_period=loop_max_period, threshold=loop_threshold
+        )
+        # Two cycles' worth, for the Gemini tie-breaker
+        self._recent_messages = deque(maxlen=max(2 * loop_max_period, 6))
 
-        self.status_history = []
-        self.log_messages = []  # <-- Move this up here
+        self.status_history = RingBuffer(history_capacity)
+        self.log_messages = RingBuffer(log_capacity)
+        # Non-ok statuses only, so the report never scans the full history
+        self._recent_issues = RingBuffer(5)
+        self._first_check_at = None
 
         # Error patterns and solutions
         self.error_patterns = {
@@ -41,68 +87,66 @@ class SurveillanceAgent:
             ],
             "team_deadlock": ["agents not making progress", "circular conversation"],
         }
+        # Extra patterns from the caller, merged into the built-in categories
+        for category, patterns in (error_patterns or {}).items():
+            self.error_patterns.setdefault(category, []).extend(patterns)
+        # Every pattern compiled into one case-insensitive regex
+        self.error_matcher = PatternMatcher(self.error_patterns)
 
         self.max_input_tokens = 4000
         self.token_warning_threshold = 0.9
 
-        # Initialize Gemini
+        # Initialize Gemini; the key is read when the agent is built, and an
+        # empty one keeps it off
+        if gemini_api_key is None:
+            gemini_api_key = os.getenv("API_KEY")
         self.gemini_client = None
         if gemini_api_key:
             try:
+                # Imported here: the SDK is slow to import and only needed with a key
+                import google.generativeai as genai
+
                 genai.configure(api_key=gemini_api_key)
                 self.gemini_client = genai.GenerativeModel("gemini-pro")
                 self._log("Gemini AI agent initialized successfully")
             except Exception as e:
                 self._log(f"Failed to initialize Gemini: {str(e)}")
 
-            # Error patterns and solutions
-            self.error_patterns = {
-                "token_limit": [
-                    "token limit exceeded",
-                    "context length",
-                    "too many tokens",
-                ],
-                "api_failure": [
-                    "API error",
-                    "rate limit",
-                    "connection error",
-                    "timeout",
-                ],
-                "model_error": [
-                    "content policy violation",
-                    "model error",
-                    "failed to generate",
-                ],
-                "team_deadlock": [
-                    "agents not making progress",
-                    "circular conversation",
-                ],
-            }
+    def _may_call_ai(self) -> bool:
+        return self._ai_calls < max(self._workload_calls, 1)
 
-            self.status_history = []
-            self.log_messages = []
-            self.max_input_tokens = 4000
-            self.token_warning_threshold = 0.9
+    async def _generate(self, prompt: str, **kwargs) -> str:
+        self._ai_calls += 1
+        response = await self.gemini_client.generate_content_async(prompt, **kwargs)
+        return response.text
 
     async def get_ai_suggestion(self, context: str) -> str:
         """Get AI-powered suggestion from Gemini."""
         if not self.gemini_client:
             return "No AI agent available for suggestions"
 
+        fallback = f"Standard solution: {self._get_standard_solution(context)}"
         try:
-            response = await self.gemini_client.generate_content_async(
-                f"Analyze this system monitoring context and provide a concise solution:\n{context}",
-                safety_settings={
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                },
+            from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+            return await self.suggestions.get(
+                "suggestion",
+                context,
+                lambda: self._generate(
+                    f"Analyze this system monitoring context and provide a concise solution:\n{context}",
+                    safety_settings={
+                        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                    },
+                ),
+                fallback,
+                may_call=self._may_call_ai(),
             )
-            return response.text
         except Exception as e:
-            self._log(f"Gemini suggestion error: {str(e)}")
-            return f"Standard solution: {self._get_standard_solution(context)}"
+            self._log(f"Gemini suggestion error: {str(e)}", level="error")
+            return fallback
 
     def _get_standard_solution(self, error_type: str) -> str:
         """Fallback standard solutions when Gemini isn't available."""
@@ -118,9 +162,7 @@ class SurveillanceAgent:
     async def check_input_tokens(self, text: str) -> Dict[str, Any]:
         """Enhanced token check with AI suggestions."""
         try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-            tokens = encoding.encode(text)
-            token_count = len(tokens)
+            token_count = count_tokens(text)
 
             if token_count > self.max_input_tokens:
                 context = (
@@ -128,7 +170,12 @@ class SurveillanceAgent:
                 )
                 suggestion = await self.get_ai_suggestion("token_limit")
 
-                self._log(f"Token limit exceeded: {context}")
+                self._log(
+                    f"Token limit exceeded: {context}",
+                    level="error",
+                    type="input_too_long",
+                    token_count=token_count,
+                )
                 self._log(f"AI Suggestion: {suggestion}")
 
                 return {
@@ -164,78 +211,23 @@ class SurveillanceAgent:
 
         except Exception as e:
             error_msg = f"Token counting error: {str(e)}"
-            self._log(error_msg)
+            self._log(error_msg, level="error", type="token_count_error")
             return {
                 "status": "error",
                 "type": "token_count_error",
                 "message": error_msg,
             }
 
-    async def _check_team_health(self) -> Dict[str, Any]:
-        """Enhanced health check with AI analysis."""
-        # Check input tokens
-        if hasattr(self.palette, "text_input") and self.palette.text_input:
-            input_check = await self.check_input_tokens(self.palette.text_input)
-            if input_check["status"] != "ok":
-                return {
-                    "status": input_check["status"],
-                    "type": input_check["type"],
-                    "solution": input_check.get("suggestion"),
-                    "message": input_check["message"],
-                    "auto_recoverable": False,
-                }
-
-        # Check conversation activity
-        if not hasattr(self.palette.team, "messages") or not self.palette.team.messages:
-            return {"status": "ok", "message": "No active conversation to monitor"}
-
-        messages = self.palette.team.messages
-
-        # AI-powered deadlock detection
-        if len(messages) > 6 and await self._ai_detect_deadlock(messages):
-            context = "Agents appear stuck in circular conversation"
-            suggestion = await self.get_ai_suggestion("team_deadlock")
-
-            self._log(f"Deadlock detected: {context}")
-            self._log(f"AI Suggestion: {suggestion}")
-
-            return {
-                "status": "warning",
-                "type": "team_deadlock",
-                "solution": suggestion,
-                "auto_recoverable": True,
-            }
-
-        # AI-powered error detection
-        for msg in messages[-3:]:
-            if hasattr(msg, "content"):
-                error_type = self._detect_error(msg.content)
-                if error_type:
-                    context = (
-                        f"Detected {error_type} in message: {msg.content[:100]}..."
-                    )
-                    suggestion = await self.get_ai_suggestion(error_type)
-
-                    self._log(context)
-                    self._log(f"AI Suggestion: {suggestion}")
-
-                    return {
-                        "status": "error",
-                        "type": error_type,
-                        "solution": suggestion,
-                        "auto_recoverable": error_type in ["api_failure"],
-                    }
-
-        return {"status": "ok"}
-
     async def _ai_detect_deadlock(self, messages: List) -> bool:
         """Use AI to detect conversation deadlocks."""
         if len(messages) < 6:
             return False
+        if not self.gemini_client:
+            return self._detect_deadlock(messages)
 
         conversation_snippet = "\n".join(
             f"{msg.source}: {msg.content[:200]}"
-            for msg in messages[-6:]
+            for msg in messages
             if hasattr(msg, "content") and hasattr(msg, "source")
         )
 
@@ -245,8 +237,17 @@ class SurveillanceAgent:
             
             Respond only with 'yes' or 'no'."""
 
-            response = await self.gemini_client.generate_content_async(prompt)
-            return response.text.strip().lower() == "yes"
+            # An empty answer means the call was skipped by the rate limit
+            answer = await self.suggestions.get(
+                "deadlock",
+                conversation_snippet,
+                lambda: self._generate(prompt),
+                "",
+                may_call=self._may_call_ai(),
+            )
+            if not answer:
+                return self._detect_deadlock(messages)
+            return answer.strip().lower() == "yes"
         except Exception:
             # Fallback to standard detection if AI fails
             return self._detect_deadlock(messages)
@@ -266,178 +267,156 @@ class SurveillanceAgent:
         )
 
     def start_background_monitoring(self):
-        """Start the surveillance agent in the background."""
+        """Subscribe the surveillance agent to the team's message stream."""
         if self.monitoring_active:
             self._log("Surveillance monitoring is already active.")
             return
 
         self.monitoring_active = True
-        self.background_thread = threading.Thread(target=self._background_monitor_loop)
-        self.background_thread.daemon = True
-        self.background_thread.start()
-        self._log("Surveillance Agent activated and monitoring in background.")
+        self._log("Surveillance Agent activated and monitoring the message stream.")
 
     def stop_background_monitoring(self):
-        """Stop the background monitoring."""
+        """Stop evaluating new messages."""
         if not self.monitoring_active:
             return
 
         self.monitoring_active = False
-        if self.background_thread:
-            self.background_thread.join(timeout=2.0)
-            self._log("Surveillance Agent deactivated.")
-
-    def _log(self, message):
-        """Log a message to the internal log instead of printing it."""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.log_messages.append(f"[{timestamp}] {message}")
-        # Limit log size
-        if len(self.log_messages) > 100:
-            self.log_messages = self.log_messages[-100:]
-
-    def _background_monitor_loop(self):
-        """Main background monitoring loop."""
-        while self.monitoring_active:
-            try:
-                # Check team health
-                health_status = self._check_team_health()
+        self._log("Surveillance Agent deactivated.")
 
-                if health_status["status"] != "ok":
-                    self._log(f"SURVEILLANCE ALERT: {health_status['type']}")
-                    self._log(f"SUGGESTED SOLUTION: {health_status['solution']}")
-
-                    # Attempt auto-recovery if enabled
-                    if health_status.get("auto_recoverable", False):
-                        self._log("Attempting auto-recovery...")
-                        self._attempt_recovery(health_status["type"])
+    def _log(self, message, level="info", type="log", **payload):
+        """Log a structured record to the internal log instead of printing it."""
+        self.log_messages.append(
+            SurveillanceRecord(
+                time.time(), level, type, {"message": message, **payload}
+            )
+        )
 
-                # Store health status history
-                self.status_history.append(
-                    {"timestamp": time.time(), "status": health_status}
+    def begin_run(self):
+        """Forget the previous run's messages before a new one streams."""
+        self._recent_messages.clear()
+        self.loop_detector.reset()
+
+    async def observe(self, message) -> Dict[str, Any]:
+        """Evaluate one newly streamed team message.
+
+        Only the new message is scanned for errors, and deadlock detection
+        looks at the small window of recent messages kept here, so nothing
+        runs while the team is idle.
+        """
+        content = getattr(message, "content", None)
+        if not self.monitoring_active or not isinstance(content, str):
+            return self.last_status
+
+        self._recent_messages.append(message)
+        if getattr(message, "models_usage", None) is not None:
+            self._workload_calls += 1
+        health_status = {"status": "ok"}
+
+        verdict = self.loop_detector.add(getattr(message, "source", ""), content)
+        deadlock = verdict.loop
+        if verdict.suspect and self.gemini_client:
+            # Only borderline cycles are worth asking Gemini about
+            deadlock = await self._ai_detect_deadlock(list(self._recent_messages))
+
+        if deadlock:
+            suggestion = await self.get_ai_suggestion("team_deadlock")
+            self._log(
+                "Deadlock detected: Agents appear stuck in circular conversation",
+                period=verdict.period,
+                similarity=verdict.similarity,
+            )
+            health_status = {
+                "status": "warning",
+                "type": "team_deadlock",
+                "solution": suggestion,
+                "auto_recoverable": True,
+            }
+        else:
+            error_type = self.error_matcher.category(content)
+            if error_type:
+                matches = self.error_matcher.scan(content)
+                suggestion = await self.get_ai_suggestion(error_type)
+                self._log(
+                    f"Detected {error_type} in message: {content[:100]}...",
+                    matches=[
+                        {"category": m.category, "text": m.text, "start": m.start}
+                        for m in matches
+                    ],
                 )
+                health_status = {
+                    "status": "error",
+                    "type": error_type,
+                    "solution": suggestion,
+                    "auto_recoverable": error_type in ["api_failure"],
+                }
 
-                # Keep history manageable
-                if len(self.status_history) > 100:
-                    self.status_history = self.status_history[-100:]
-
-                # Sleep before next check
-                time.sleep(5)  # Check every 5 seconds
+        if health_status["status"] != "ok":
+            self._log(
+                f"SURVEILLANCE ALERT: {health_status['type']}",
+                level=health_status["status"],
+                type=health_status["type"],
+            )
+            self._log(
+                f"SUGGESTED SOLUTION: {health_status['solution']}",
+                type="suggestion",
+                solution=health_status["solution"],
+            )
 
-            except Exception as e:
-                self._log(f"Surveillance monitoring error: {str(e)}")
-                time.sleep(10)  # Back off on errors
-
-    def _check_team_health(self) -> Dict[str, Any]:
-        """Check the health status of the team."""
-        # First check input tokens if there's text input
-        if hasattr(self.palette, "text_input") and self.palette.text_input:
-            input_check = asyncio.run(self.check_input_tokens(self.palette.text_input))
-            if input_check["status"] != "ok":
-                return {
-                    "status": input_check["status"],
-                    "type": input_check["type"],
-                    "solution": input_check.get(
-                        "suggestion", self.solutions.get(input_check["type"], "")
-                    ),
-                    "message": input_check["message"],
-                    "auto_recoverable": False,
-                }
-        # Check if a conversation is active
-        if not hasattr(self.palette.team, "messages") or not self.palette.team.messages:
-            return {"status": "ok", "message": "No active conversation to monitor"}
+            # Attempt auto-recovery if enabled
+            if health_status.get("auto_recoverable", False):
+                self._log("Attempting auto-recovery...")
+                self._attempt_recovery(health_status["type"])
 
-        messages = self.palette.team.messages
+        # Store health status history
+        entry = {"timestamp": time.time(), "status": health_status}
+        self.last_status = health_status
+        self.status_history.append(entry)
+        if self._first_check_at is None:
+            self._first_check_at = entry["timestamp"]
+        if health_status["status"] != "ok":
+            self._recent_issues.append(entry)
 
-        # Check for team deadlock
-        if len(messages) > 6:
-            if self._detect_deadlock(messages):
-                return {
-                    "status": "warning",
-                    "type": "team_deadlock",
-                    "solution": self.solutions["team_deadlock"],
-                    "auto_recoverable": True,
-                }
+        return health_status
 
-        # Check last few messages for errors
-        for msg in messages[-3:]:
-            if hasattr(msg, "content"):
-                error_type = self._detect_error(msg.content)
-                if error_type:
-                    return {
-                        "status": "error",
-                        "type": error_type,
-                        "solution": self.solutions[error_type],
-                        "auto_recoverable": error_type in ["api_failure"],
-                    }
+    def register_error_pattern(self, category: str, *patterns: str):
+        """Watch for more error patterns, matched case-insensitively.
 
-        return {"status": "ok"}
+        A new category gets the generic standard solution.
+        """
+        self.error_patterns.setdefault(category, []).extend(patterns)
+        self.error_matcher.add(category, *patterns)
 
     def _detect_error(self, message_text: str) -> Optional[str]:
         """Check message for known error patterns."""
-        if not message_text:
-            return None
-
-        lower_text = message_text.lower()
-        for error_type, patterns in self.error_patterns.items():
-            if any(pattern in lower_text for pattern in patterns):
-                return error_type
-        return None
+        return self.error_matcher.category(message_text)
 
     def _detect_deadlock(self, messages: List) -> bool:
         """Check if conversation is stuck in a loop."""
-        if len(messages) < 6:
-            return False
-
-        # Extract relevant information from messages
-        recent_contents = []
-        recent_sources = []
-
-        for msg in messages[-6:]:
+        detector = LoopDetector(
+            max_period=self.loop_detector.max_period,
+            threshold=self.loop_detector.threshold,
+        )
+        verdict = None
+        for msg in messages:
             if hasattr(msg, "content") and hasattr(msg, "source"):
-                recent_contents.append(msg.content)
-                recent_sources.append(msg.source)
-
-        # Check for repeated patterns
-        for i in range(len(recent_contents) - 2):
-            if (
-                recent_sources[i] == recent_sources[i + 2]
-            ):  # Same agent talking every other turn
-                similarity = self._text_similarity(
-                    recent_contents[i], recent_contents[i + 2]
-                )
-                if similarity > 0.7:  # High similarity threshold
-                    return True
-
-        return False
+                verdict = detector.add(msg.source, str(msg.content))
+        return bool(verdict and verdict.loop)
 
     def get_logs(self):
-        """Get the surveillance agent logs."""
-        return self.log_messages
-
-    def _text_similarity(self, text1: str, text2: str) -> float:
-        """Simple text similarity measure."""
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        if not words1 or not words2:
-            return 0
-        intersection = words1.intersection(words2)
-        return len(intersection) / max(len(words1), len(words2))
+        """Get the surveillance agent logs as display strings."""
+        return [format_record(record) for record in self.log_messages.snapshot()]
+
+    def get_log_records(self) -> List[SurveillanceRecord]:
+        """Get the surveillance agent logs as structured records."""
+        return self.log_messages.snapshot()
 
     def _attempt_recovery(self, error_type: str):
         """Attempt to automatically recover from specific errors."""
         if error_type == "team_deadlock":
-            # Create a new asyncio event loop in this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            try:
-                # Reset the team
-                loop.run_until_complete(self.palette.create_new_team())
-                self._log("Team reset successfully after deadlock detection.")
-            except Exception as e:
-                self._log(f"Error during auto-recovery: {str(e)}")
-            finally:
-                loop.close()
+            # Stop the stuck run after the current turn; the next run starts
+            # from a reset team.
+            self.palette.stopping_team()
+            self._log("Stopping the deadlocked run.")
 
         elif error_type == "api_failure":
             # Maybe implement retry logic or API key rotation
@@ -447,16 +426,18 @@ class SurveillanceAgent:
         """Generate a status report of the monitoring."""
         return {
             "active": self.monitoring_active,
-            "uptime": time.time() - self.status_history[0]["timestamp"]
-            if self.status_history
-            else 0,
-            "total_checks": len(self.status_history),
-            "recent_issues": [
-                h for h in self.status_history if h["status"]["status"] != "ok"
-            ][-5:],
-            "current_status": self._check_team_health(),
+            "uptime": time.time() - self._first_check_at if self._first_check_at else 0,
+            "total_checks": self.status_history.total,
+            "recent_issues": self._recent_issues.snapshot(),
+            "current_status": self.last_status,
+            "ai_calls": self._ai_calls,
+            "suggestions": self.suggestions.stats(),
         }
 
+    async def aget_status_report(self) -> Dict[str, Any]:
+        """Status report for callers already running an event loop."""
+        return self.get_status_report()
+
 
 class Palette:
     def __init__(
@@ -496,6 +477,14 @@ class Palette:
         *args,
         **kwargs,
     ):
+        # Constructor arguments, so clone() can build an identical team
+        self._init_args = {
+            name: value
+            for name, value in locals().items()
+            if name not in ("self", "args", "kwargs")
+        }
+        self._init_args.update(kwargs)
+
         if config:
             provider_1 = provider_1 or config.get("provider_1")
             provider_2 = provider_2 or config.get("provider_2")
@@ -509,10 +498,12 @@ class Palette:
             api_key_2 = api_key_2 or config.get("api_key_2")
             api_key_3 = api_key_3 or config.get("api_key_3")
             api_key_4 = api_key_4 or config.get("api_key_4")
-            behaviour_1 = behaviour_1 or config.get("behaviour_1", "primary")
-            behaviour_2 = behaviour_2 or config.get("behaviour_2", "critic")
-            behaviour_3 = behaviour_3 or config.get("behaviour_3", "advisor")
-            behaviour_4 = behaviour_4 or config.get("behaviour_4", "executor")
+            # Behaviours and termination_text have non-empty defaults, so the
+            # config takes precedence for them
+            behaviour_1 = config.get("behaviour_1", behaviour_1)
+            behaviour_2 = config.get("behaviour_2", behaviour_2)
+            behaviour_3 = config.get("behaviour_3", behaviour_3)
+            behaviour_4 = config.get("behaviour_4", behaviour_4)
             description_1 = description_1 or config.get("description_1")
             description_2 = description_2 or config.get("description_2")
             description_3 = description_3 or config.get("description_3")
@@ -521,9 +512,7 @@ class Palette:
             system_message_2 = system_message_2 or config.get("system_message_2")
             system_message_3 = system_message_3 or config.get("system_message_3")
             system_message_4 = system_message_4 or config.get("system_message_4")
-            termination_text = termination_text or config.get(
-                "termination_text", "Approve"
-            )
+            termination_text = config.get("termination_text", termination_text)
             external_termination = external_termination or config.get(
                 "external_termination"
             )
@@ -531,6 +520,7 @@ class Palette:
             max_tokens_2 = max_tokens_2 or config.get("max_tokens_2")
             max_tokens_3 = max_tokens_3 or config.get("max_tokens_3")
             max_tokens_4 = max_tokens_4 or config.get("max_tokens_4")
+            token_threshold = config.get("token_threshold", token_threshold)
 
         if not (agent_1 and provider_1 and agent_2 and provider_2):
             raise ValueError("At least two agents with their providers must be defined")
@@ -544,7 +534,7 @@ class Palette:
         self.provider_3 = provider_3
         self.provider_4 = provider_4
         self.termination_text = termination_text
-        self.external_termination = ExternalTermination()
+        self.external_termination = external_termination or ExternalTermination()
         self.api_key_1 = api_key_1
         self.api_key_2 = api_key_2
         self.api_key_3 = api_key_3
@@ -566,10 +556,76 @@ class Palette:
         self.max_tokens_3 = max_tokens_3
         self.max_tokens_4 = max_tokens_4
         self.token_threshold = token_threshold
-        self.surveillance = SurveillanceAgent(self)
+        # "continue" resumes on a fresh team from a compressed summary of the
+        # run so far when token_threshold is hit; "restart" reruns the task
+        self.resume_mode = kwargs.get("resume_mode", "continue")
+        self.resume_context_words = kwargs.get("resume_context_words", 400)
+        # Hard cap on prompt + completion tokens for one run, resumes included
+        self.token_budget = kwargs.get("token_budget")
+        # "round_robin" lets the agents take turns; "fanout" has agents 2-4
+        # review each primary answer concurrently
+        self.topology = kwargs.get("topology", "round_robin")
+        if self.topology not in ("round_robin", "fanout"):
+            raise ValueError(f"Unsupported topology: {self.topology}")
+        # Reviewer approvals needed to stop, and the seconds after which a
+        # round stops on its first approval
+        self.quorum_size = kwargs.get("quorum", 1)
+        self.quorum_time_budget = kwargs.get("quorum_time_budget")
+        # Opt-in ResultCache of whole-team results for repeated questions
+        self.result_cache = kwargs.get("result_cache")
+        # Ollama prompt-cache reuse: keep the model loaded and the context
+        # size fixed so the system message prefix stays in the KV cache
+        self.ollama_keep_alive = kwargs.get("ollama_keep_alive")
+        self.ollama_num_ctx = kwargs.get("ollama_num_ctx")
+        self.ollama_options = kwargs.get("ollama_options")
+        # Build each model client on its agent's first turn rather than here
+        self.lazy_clients = kwargs.get("lazy_clients", True)
+        # What each agent is sent of the history: "last_turns:N",
+        # "last_tokens:N" or "summarize:N", see context_policy.py;
+        # context_policy_N overrides it for agent N
+        default_policy = kwargs.get("context_policy")
+        self.context_policies = {
+            n: parse_context_policy(kwargs.get(f"context_policy_{n}", default_policy))
+            for n in range(1, 5)
+        }
+        # Model contexts by agent name, for the trimming metrics
+        self.model_contexts = {}
+        # Pre-flight estimate of every agent's tokens and cost against its
+        # context window and the budgets; jobs that don't fit are rejected,
+        # cut to fewer rounds or rerouted, see budget_planner.py
+        self.planner = BudgetPlanner(
+            catalog=kwargs.get("model_catalog"),
+            rounds=kwargs.get("planned_rounds", 3),
+            completion_tokens=kwargs.get("planned_completion_tokens", 400),
+            token_budget=self.token_budget,
+            cost_budget=kwargs.get("cost_budget"),
+            action=kwargs.get("budget_action", "downsize"),
+            reroutes=kwargs.get("reroutes"),
+        )
+        self.last_plan = {}
+        # Agent turns allowed in the next run by a downsized plan
+        self._turn_limit = None
+        # Hard cap on agent turns per run, resumes included
+        self.max_turns = kwargs.get("max_turns")
+        self.last_run_stats = {}
+        self.last_batch_report = {}
+        self.surveillance = SurveillanceAgent(
+            self,
+            log_capacity=kwargs.get("surveillance_log_capacity", 100),
+            history_capacity=kwargs.get("surveillance_history_capacity", 100),
+            error_patterns=kwargs.get("error_patterns"),
+            loop_max_period=kwargs.get("loop_max_period", 6),
+            loop_threshold=kwargs.get("loop_threshold", 0.7),
+        )
         self.text_input = ""
+        # Cancels the team run in progress, see cancel_run()
+        self._run_token = None
+        # One run at a time per team; concurrent callers queue up here
+        self._run_lock = asyncio.Lock()
 
         self.agents = []
+        # Shared clients from the model registry, released by aclose()
+        self._model_clients = []
 
         auto_monitor = kwargs.get("auto_monitor", True)
         if auto_monitor:
@@ -580,25 +636,33 @@ class Palette:
             model_name=self.agent_1,
             api_key=self.api_key_1,
             max_tokens=self.max_tokens_1,
+            **self._ollama_args(self.provider_1, self.system_message_1),
+            lazy=self.lazy_clients,
         )
+        self._model_clients.append(self.primary_model)
         self.secondary_model = get_model_client(
             provider=self.provider_2,
             model_name=self.agent_2,
             api_key=self.api_key_2,
             max_tokens=self.max_tokens_2,
+            **self._ollama_args(self.provider_2, self.system_message_2),
+            lazy=self.lazy_clients,
         )
+        self._model_clients.append(self.secondary_model)
 
         self.primary_agent = AssistantAgent(
             self.behaviour_1,
             model_client=self.primary_model,
             description=self.description_1,
             system_message=self.system_message_1,
+            model_context=self._model_context(1, self.primary_model),
         )
         self.secondary_agent = AssistantAgent(
             self.behaviour_2,
             model_client=self.secondary_model,
             description=self.description_2,
             system_message=self.system_message_2,
+            model_context=self._model_context(2, self.secondary_model),
         )
 
         self.agents = [self.primary_agent, self.secondary_agent]
@@ -609,12 +673,16 @@ class Palette:
                 model_name=self.agent_3,
                 api_key=self.api_key_3,
                 max_tokens=self.max_tokens_3,
+                **self._ollama_args(self.provider_3, self.system_message_3),
+                lazy=self.lazy_clients,
             )
+            self._model_clients.append(self.third_model)
             self.third_agent = AssistantAgent(
                 self.behaviour_3,
                 model_client=self.third_model,
                 description=self.description_3,
                 system_message=self.system_message_3,
+                model_context=self._model_context(3, self.third_model),
             )
             self.agents.append(self.third_agent)
 
@@ -624,84 +692,643 @@ class Palette:
                 model_name=self.agent_4,
                 api_key=self.api_key_4,
                 max_tokens=self.max_tokens_4,
+                **self._ollama_args(self.provider_4, self.system_message_4),
+                lazy=self.lazy_clients,
             )
+            self._model_clients.append(self.fourth_model)
             self.fourth_agent = AssistantAgent(
                 self.behaviour_4,
                 model_client=self.fourth_model,
                 description=self.description_4,
                 system_message=self.system_message_4,
+                model_context=self._model_context(4, self.fourth_model),
             )
             self.agents.append(self.fourth_agent)
 
         self.text_termination = TextMentionTermination(self.termination_text)
-        self.team = RoundRobinGroupChat(
+        # Enforces max_turns and downsized budget plans, set per run
+        self.turn_limiter = TurnLimitTermination()
+        self.quorum = None
+        if self.quorum_size > 1 or self.quorum_time_budget is not None:
+            self.quorum = QuorumTermination(
+                self.termination_text,
+                primary_source=self.behaviour_1,
+                approvals=self.quorum_size,
+                time_budget=self.quorum_time_budget,
+            )
+        # Records whether the reviewers stopped the run, quorum or not
+        self.approval = ApprovalTermination(self.quorum or self.text_termination)
+        self.termination_condition = (
+            self.approval | self.external_termination | self.turn_limiter
+        )
+        self.team = self._build_team()
+        self._team_loop = None
+
+    def _ollama_args(self, provider, system_message) -> Dict[str, Any]:
+        """Ollama prefix-reuse options for an agent; empty for other providers."""
+        if provider != ModelProvider.OLLAMA:
+            return {}
+        if not (self.ollama_keep_alive or self.ollama_num_ctx or self.ollama_options):
+            return {}
+        args = {
+            "keep_alive": self.ollama_keep_alive,
+            "num_ctx": self.ollama_num_ctx,
+            "options": self.ollama_options,
+        }
+        if system_message:
+            # Pin the system message (plus the chat template's header) so a
+            # context shift never evicts the shared prefix
+            args["num_keep"] = count_tokens(system_message) + 8
+        return args
+
+    def _model_context(self, n, model_client):
+        """Agent ``n``'s model context under its policy; None sends everything.
+
+        A ``summarize`` policy with its own ``provider`` and ``model`` gets a
+        separate (cheaper) summarizer client, otherwise the agent's own.
+        """
+        policy = self.context_policies[n]
+        if policy is None:
+            return None
+        summarizer = model_client
+        if policy["type"] == "summarize" and policy.get("provider"):
+            client_args = {"max_tokens": policy.get("max_tokens", 300)}
+            if policy.get("api_key"):
+                client_args["api_key"] = policy["api_key"]
+            if policy.get("end_point"):
+                client_args["end_point"] = policy["end_point"]
+            summarizer = get_model_client(
+                provider=policy["provider"],
+                model_name=policy["model"],
+                lazy=self.lazy_clients,
+                **client_args,
+            )
+            self._model_clients.append(summarizer)
+        context = build_context(policy, summarizer)
+        self.model_contexts[getattr(self, f"behaviour_{n}")] = context
+        return context
+
+    def context_stats(self) -> Dict[str, Dict[str, int]]:
+        """Cumulative trimming counters per agent with a context policy."""
+        return {name: context.stats() for name, context in self.model_contexts.items()}
+
+    def _build_team(self):
+        if self.topology == "fanout":
+            return FanoutTeam(
+                self.agents,
+                termination_condition=self.termination_condition,
+                quorum=self.quorum,
+            )
+        return RoundRobinGroupChat(
             self.agents,
-            termination_condition=self.text_termination,
+            termination_condition=self.termination_condition,
         )
 
+    def _compress(self, text: str) -> str:
+        """Trim text to ``resume_context_words`` words for a continuation."""
+        words = text.split()
+        if len(words) <= self.resume_context_words:
+            return text
+        return " ".join(words[: self.resume_context_words]) + " [...]"
+
+    def _build_continuation_task(self, text_input, last_answer, feedback) -> str:
+        """Compose the task for a fresh team from the useful state so far."""
+        parts = [text_input, "", "A previous attempt was stopped early."]
+        if last_answer:
+            parts += ["", "Latest answer:", self._compress(last_answer)]
+        if feedback:
+            parts += ["", "Reviewer feedback on that answer:"]
+            parts += [
+                f"- {source}: {self._compress(text)}"
+                for source, text in feedback.items()
+            ]
+        parts += ["", "Continue from the latest answer and address the feedback."]
+        return "\n".join(parts)
+
+    async def stream_convo_and_count_tokens(self, text_input: str):
+        """Yield each team message as soon as it is produced.
+
+        Messages are yielded as ``{"source", "content"}`` dicts. When a run
+        reaches ``token_threshold`` it is either resumed on a fresh team from
+        the latest answer and feedback (``{"type": "resume"}``) or rerun from
+        scratch (``{"type": "reset"}``), depending on ``resume_mode``. A final
+        ``{"type": "usage"}`` event carries the token count with its per-agent
+        prompt/completion breakdown, how many tokens resuming saved
+        compared with full restarts, and how many prompt tokens the context
+        policies trimmed.
+
+        A resumed run is only stopped after a reviewer turn, so the fresh
+        team gets feedback on the latest answer. Its saving is the stopped
+        segment a restart would redo, less the carried state it paid for in
+        every prompt of the resumed segment; it is negative when resuming
+        cost more.
+        """
+        task = text_input
+        task_tokens = count_tokens(text_input)
+        ledger = TokenLedger()
+        context_start = self.context_stats()
+        limits = [limit for limit in (self._turn_limit, self.max_turns) if limit]
+        turn_limit = min(limits) if limits else None
+        self._turn_limit = None
+        turns = 0
+        capped = False
+        tokens_saved = 0
+        redo_tokens = None
+        over_budget = False
+        retries = 0
+        last_answer = None
+        feedback = {}
+        await self._bind_team_loop()
+
+        while True:
+            segment_start = ledger.total
+            segment_turns = turns
+            stopping = False
+            resuming = False
+            first_message = True
+
+            self.surveillance.begin_run()
+            # Turns left for this segment; resumed segments count too
+            self.turn_limiter.limit = turn_limit - turns if turn_limit else None
+            await self.turn_limiter.reset()
+            self.approval.clear()
+            self._run_token = CancellationToken()
+            async for message in self.team.run_stream(
+                task=task, cancellation_token=self._run_token
+            ):
+                if hasattr(message, "source") and hasattr(message, "content"):
+                    ledger.record(message)
+                    await self.surveillance.observe(message)
+                    segment_tokens = ledger.total - segment_start
+
+                    if message.source == "user":
+                        # A resumed run echoes the synthetic continuation task
+                        if first_message and task is not text_input:
+                            first_message = False
+                            continue
+                    elif message.source == self.behaviour_1:
+                        last_answer = message.content
+                        feedback = {}
+                    else:
+                        feedback[message.source] = message.content
+                    first_message = False
+                    if message.source != "user":
+                        turns += 1
+
+                    yield {"source": message.source, "content": message.content}
+
+                    if (
+                        self.token_budget
+                        and not over_budget
+                        and ledger.total >= self.token_budget
+                    ):
+                        # Hard cap for the whole run, resumes included
+                        self.external_termination.set()
+                        stopping = True
+                        over_budget = True
+                    elif (
+                        self.resume_mode == "continue"
+                        and not stopping
+                        and not self.approval.approved
+                        and retries < 2
+                        and message.source not in ("user", self.behaviour_1)
+                        and segment_tokens >= self.token_threshold
+                    ):
+                        # Stop once the latest answer has been reviewed, so
+                        # the resumed team gets the feedback along with it
+                        self.external_termination.set()
+                        stopping = True
+                        resuming = True
+                elif isinstance(message, str):
+                    yield {"source": "system", "content": message}
+
+            segment_tokens = ledger.total - segment_start
+            print(f"Total Tokens Used: {segment_tokens}")
+            approved = self.approval.approved
+            if stopping:
+                # The run may have stopped on another condition before ours
+                # was seen; don't let it stop the next segment at once
+                await self.external_termination.reset()
+            capped = bool(turn_limit) and turns >= turn_limit
+            if redo_tokens is not None:
+                # A restart would have redone the stopped segment; resuming
+                # paid for the carried state in each prompt of this one
+                tokens_saved += redo_tokens - extra_tokens * (turns - segment_turns)
+                redo_tokens = None
+
+            if segment_tokens < self.token_threshold or retries >= 2:
+                break
+            if over_budget or capped:
+                break
+            if self.resume_mode == "continue" and (approved or not resuming):
+                break
+
+            print("Token limit exceeded, expanding team...")
+            await self.create_new_team()
+            retries += 1
+
+            if self.resume_mode == "continue":
+                task = self._build_continuation_task(text_input, last_answer, feedback)
+                extra_tokens = count_tokens(task) - task_tokens
+                redo_tokens = segment_tokens
+                yield {
+                    "source": "system",
+                    "type": "resume",
+                    "content": "Token limit reached, resuming on a fresh team.",
+                }
+            else:
+                ledger = TokenLedger()
+                yield {
+                    "source": "system",
+                    "type": "reset",
+                    "content": "Token limit exceeded, restarting the team.",
+                }
+
+        self.last_run_stats = {
+            **ledger.summary(),
+            "over_budget": over_budget,
+            "tokens_saved": tokens_saved,
+            "resumes": retries if self.resume_mode == "continue" else 0,
+            "restarts": retries if self.resume_mode != "continue" else 0,
+            "turn_limit": turn_limit,
+            "capped": capped,
+            "approved": approved,
+            **self._context_usage(context_start),
+        }
+        yield {"source": "system", "type": "usage", **self.last_run_stats}
+
+    def _context_usage(self, start) -> Dict[str, Any]:
+        """Prompt tokens the context policies trimmed since ``start``."""
+        per_agent = {
+            name: {key: value - start[name][key] for key, value in stats.items()}
+            for name, stats in self.context_stats().items()
+        }
+        return {
+            "trimmed_tokens": sum(s["trimmed_tokens"] for s in per_agent.values()),
+            "summary_tokens": sum(s["summary_tokens"] for s in per_agent.values()),
+            "context": per_agent,
+        }
+
     async def print_convo_and_count_tokens(self, text_input: str):
-        full_output = ""
         conversation_list = []
-        retries = 0
+        estimated_tokens = 0
 
-        while retries < 3:
-            async for message in self.team.run_stream(task=text_input):
-                if hasattr(message, "source") and hasattr(message, "content"):
-                    conversation_list.append(
-                        {"source": message.source, "content": message.content}
-                    )
-
-                    full_output += message.content + " "
-                else:
-                    if isinstance(message, str):
-                        conversation_list.append(
-                            {"source": "system", "content": message}
-                        )
-
-            word_count = len(full_output.split())
-            estimated_tokens = int(word_count * 1.3)
-            print(f"Estimated Total Tokens Used: {estimated_tokens}")
-
-            if estimated_tokens >= self.token_threshold:
-                print("Token limit exceeded, expanding team...")
-                await self.create_new_team()
-                retries += 1
-                full_output = ""
+        async for event in self.stream_convo_and_count_tokens(text_input):
+            if event.get("type") == "reset":
                 conversation_list = []
+            elif event.get("type") == "resume":
+                conversation_list.append(
+                    {"source": "system", "content": event["content"]}
+                )
+            elif event.get("type") == "usage":
+                estimated_tokens = event["token_count"]
             else:
-                break
+                conversation_list.append(event)
 
         return conversation_list, estimated_tokens
 
-    def run_team(self, text: str):
-        self.text_input = text
-
-        # Check input tokens before running
-        token_check = asyncio.run(self.surveillance.check_input_tokens(text))
+    async def _precheck_input(self, text: str) -> Dict[str, Any]:
+        """Check input tokens before running, printing any error."""
+        token_check = await self.surveillance.check_input_tokens(text)
         if token_check["status"] == "error":
             print(token_check["message"])
             print("\nSuggested solutions:")
-            print(token_check["suggestion"])
-            return [], 0
+            print(token_check.get("suggestion"))
+        return token_check
+
+    def team_signature(self) -> Dict[str, Any]:
+        """Everything about the team that can change its answer."""
+        return {
+            "providers": [
+                self.provider_1,
+                self.provider_2,
+                self.provider_3,
+                self.provider_4,
+            ],
+            "models": [self.agent_1, self.agent_2, self.agent_3, self.agent_4],
+            "behaviours": [agent.name for agent in self.agents],
+            "system_messages": [
+                self.system_message_1,
+                self.system_message_2,
+                self.system_message_3,
+                self.system_message_4,
+            ],
+            "max_tokens": [
+                self.max_tokens_1,
+                self.max_tokens_2,
+                self.max_tokens_3,
+                self.max_tokens_4,
+            ],
+            "termination_text": self.termination_text,
+            "topology": self.topology,
+            "quorum": [self.quorum_size, self.quorum_time_budget],
+        }
+
+    def _cache_lookup(self, text: str):
+        """Return ``(key, cached result)``; both are None without a cache."""
+        if self.result_cache is None:
+            return None, None
+        key = cache_key(text, self.team_signature())
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            conversation_list, token_count = cached
+            # Echo this caller's wording, not the one that filled the cache
+            if conversation_list and conversation_list[0].get("source") == "user":
+                conversation_list[0] = {**conversation_list[0], "content": text}
+            cached = conversation_list, token_count
+        return key, cached
+
+    def _cache_store(self, key, conversation_list, token_count):
+        # Truncated runs would poison the cache
+        if key is None or not conversation_list:
+            return
+        if self.last_run_stats.get("over_budget"):
+            return
+        self.result_cache.put(key, conversation_list, token_count)
+
+    def _agent_profiles(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for n in range(1, 5):
+            provider = getattr(self, f"provider_{n}")
+            model = getattr(self, f"agent_{n}")
+            if not (model and provider):
+                continue
+            profiles.append(
+                agent_profile(
+                    getattr(self, f"behaviour_{n}"),
+                    model,
+                    provider,
+                    getattr(self, f"system_message_{n}"),
+                    getattr(self, f"max_tokens_{n}"),
+                    self.context_policies[n],
+                    n,
+                    num_ctx=(
+                        self.ollama_num_ctx
+                        if provider == ModelProvider.OLLAMA
+                        else None
+                    ),
+                )
+            )
+        return profiles
+
+    def plan_run(self, text: str) -> BudgetPlan:
+        """Estimate a run on ``text`` before starting it; see ``BudgetPlanner``.
+
+        The plan is kept in ``last_plan``.
+        """
+        plan = self.planner.plan(
+            self._agent_profiles(), count_tokens(text), self.topology
+        )
+        self.last_plan = plan.as_dict()
+        if plan.action != "run":
+            print(f"Budget plan: {plan.action} ({'; '.join(plan.reasons)})")
+        return plan
+
+    def _plan_rejection(self, plan: BudgetPlan) -> str:
+        return "The team can't answer this within its limits: " + "; ".join(
+            plan.reasons
+        )
+
+    def _rerouted_team(self, plan: BudgetPlan):
+        """A clone of this team with the plan's models swapped in."""
+        return self.clone(
+            **plan.overrides, budget_action="downsize", auto_monitor=False
+        )
+
+    async def _run_once(self, text: str):
+        """Answer one question, raising instead of reporting failures."""
+        key, cached = self._cache_lookup(text)
+        if cached is not None:
+            return cached
+
+        token_check = await self._precheck_input(text)
+        if token_check["status"] == "error":
+            raise InputRejectedError(token_check["message"])
+
+        plan = self.plan_run(text)
+        if plan.action == "reject":
+            raise InputRejectedError(self._plan_rejection(plan))
+        if plan.action == "reroute":
+            rerouted = self._rerouted_team(plan)
+            try:
+                result = await rerouted._run_once(text)
+                self.last_run_stats = rerouted.last_run_stats
+                return result
+            finally:
+                await rerouted.aclose()
+        self._turn_limit = plan.max_turns
 
+        conversation_list, token_count = await self.print_convo_and_count_tokens(text)
+        self._cache_store(key, conversation_list, token_count)
+        return conversation_list, token_count
+
+    async def arun_team(self, text: str):
+        """Run the team on the caller's event loop.
+
+        Unlike ``run_team`` this never creates a loop of its own, so it can
+        be awaited from an async web handler.
+        """
+        async with self._run_lock:
+            self.text_input = text
+            try:
+                return await self._run_once(text)
+            except InputRejectedError:
+                return [], 0
+            except Exception as e:
+                print(f"Error running team: {str(e)}")
+                return [], 0
+
+    async def astream_team(self, text: str):
+        """Run the team and yield its messages as they arrive.
+
+        Yields the same events as ``stream_convo_and_count_tokens``; a
+        rejected input or a failed run is reported as a ``{"type": "error"}``
+        event instead of raising.
+        """
+        async with self._run_lock:
+            self.text_input = text
+
+            key, cached = self._cache_lookup(text)
+            if cached is not None:
+                conversation_list, token_count = cached
+                for message in conversation_list:
+                    yield message
+                yield {
+                    "source": "system",
+                    "type": "usage",
+                    "token_count": token_count,
+                    "cached": True,
+                }
+                return
+
+            token_check = await self._precheck_input(text)
+            if token_check["status"] == "error":
+                yield {
+                    "source": "system",
+                    "type": "error",
+                    "content": token_check["message"],
+                }
+                return
+
+            plan = self.plan_run(text)
+            if plan.action == "reject":
+                yield {
+                    "source": "system",
+                    "type": "error",
+                    "content": self._plan_rejection(plan),
+                }
+                return
+            if plan.action == "reroute":
+                rerouted = self._rerouted_team(plan)
+                try:
+                    async for event in rerouted.astream_team(text):
+                        yield event
+                    self.last_run_stats = rerouted.last_run_stats
+                finally:
+                    await rerouted.aclose()
+                return
+            self._turn_limit = plan.max_turns
+
+            # Only kept to fill the cache; streaming callers hold their own
+            conversation_list = []
+            try:
+                async for event in self.stream_convo_and_count_tokens(text):
+                    if key is not None:
+                        event_type = event.get("type")
+                        if event_type == "reset":
+                            conversation_list = []
+                        elif event_type == "resume":
+                            conversation_list.append(
+                                {"source": "system", "content": event["content"]}
+                            )
+                        elif event_type == "usage":
+                            self._cache_store(
+                                key, conversation_list, event["token_count"]
+                            )
+                        else:
+                            conversation_list.append(event)
+                    yield event
+            except Exception as e:
+                print(f"Error running team: {str(e)}")
+                yield {
+                    "source": "system",
+                    "type": "error",
+                    "content": f"Error running team: {str(e)}",
+                }
+
+    def run_team(self, text: str):
+        return asyncio.run(self.arun_team(text))
+
+    def clone(self, **overrides):
+        """A new Palette with the same configuration and its own team.
+
+        Model clients come from the shared registry, so clones reuse this
+        Palette's connections. Each clone gets its own
+        ``external_termination`` unless one is passed in ``overrides``, so
+        stopping one team never stops the others.
+        """
+        args = {**self._init_args, **overrides}
+        if "external_termination" not in overrides:
+            args["external_termination"] = None
+            config = args.get("config")
+            if config and "external_termination" in config:
+                args["config"] = {
+                    key: value
+                    for key, value in config.items()
+                    if key != "external_termination"
+                }
+        return Palette(**args)
+
+    def with_agents(self, count: int, **overrides):
+        """A clone of this team keeping only its first ``count`` agents.
+
+        ``count`` is at least two; the quorum is capped at the reviewers left.
+        """
+        dropped = {}
+        for n in range(count + 1, 5):
+            dropped[f"agent_{n}"] = None
+            dropped[f"provider_{n}"] = None
+        config = self._init_args.get("config")
+        if config:
+            dropped["config"] = {
+                key: value for key, value in config.items() if key not in dropped
+            }
+        quorum = min(self.quorum_size, count - 1)
+        return self.clone(**{**dropped, "quorum": quorum, **overrides})
+
+    async def arun_batch(
+        self,
+        tasks,
+        concurrency: int = 4,
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        ordered: bool = False,
+        report_path: Optional[str] = None,
+    ):
+        """Answer many questions concurrently, yielding results as they finish.
+
+        See ``batch_runner.arun_batch``; the aggregate report is kept in
+        ``last_batch_report``.
+        """
+        async for result in arun_batch(
+            self,
+            tasks,
+            concurrency=concurrency,
+            timeout=timeout,
+            retries=retries,
+            ordered=ordered,
+            report_path=report_path,
+        ):
+            yield result
+
+    def run_batch(self, tasks, concurrency: int = 4, **kwargs):
+        """Blocking twin of ``arun_batch``; yields results as they finish."""
+        loop = asyncio.new_event_loop()
+        results = self.arun_batch(tasks, concurrency=concurrency, **kwargs)
         try:
-            result = asyncio.run(self.print_convo_and_count_tokens(text))
-            return result
-        except Exception as e:
-            print(f"Error running team: {str(e)}")
-            return [], 0
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    def cancel_run(self):
+        """Abort the run in progress, including the model call in flight.
+
+        Unlike ``external_termination`` this doesn't wait for the current
+        turn to finish. The run raises ``asyncio.CancelledError`` and the
+        team must be reset before its next run.
+        """
+        if self._run_token is not None:
+            self._run_token.cancel()
 
     def stop_surveillance(self):
         """Stop the background surveillance."""
         if hasattr(self, "surveillance"):
             self.surveillance.stop_background_monitoring()
 
+    async def aclose(self):
+        """Stop surveillance and give the model clients back to the registry."""
+        self.stop_surveillance()
+        for client in self._model_clients:
+            release_model_client(client)
+        self._model_clients = []
+
     def surveillance_status(self):
         """Get current surveillance status."""
         if hasattr(self, "surveillance"):
             return self.surveillance.get_status_report()
         return {"active": False, "message": "Surveillance not initialized"}
 
+    async def asurveillance_status(self):
+        """Get current surveillance status from inside an event loop."""
+        if hasattr(self, "surveillance"):
+            return await self.surveillance.aget_status_report()
+        return {"active": False, "message": "Surveillance not initialized"}
+
     def display_team_members(self):
         team_members = [self.agent_1, self.agent_2]
         if hasattr(self, "agent_3") and self.agent_3:
@@ -718,7 +1345,22 @@ class Palette:
         self.surveillance.max_input_tokens = max_tokens
         print(f"Input token limit set to {max_tokens}")
 
+    async def _bind_team_loop(self):
+        """Rebuild the team if it last ran on another event loop.
+
+        Autogen's runtime queues belong to the loop that first ran them, so
+        a second ``asyncio.run`` (``run_team`` called again) needs a new
+        team. The agents are reset too: a conversation can't carry over.
+        """
+        loop = current_loop_id()
+        if self._team_loop is not None and self._team_loop != loop:
+            for agent in self.agents:
+                await agent.on_reset(CancellationToken())
+            self.team = self._build_team()
+        self._team_loop = loop
+
     async def resetting_team(self):
+        await self._bind_team_loop()
         await self.team.reset()
 
     def stopping_team(self):
@@ -727,20 +1369,14 @@ class Palette:
     async def create_new_team(self):
         print("Resetting the team with existing agents...")
         await self.team.reset()
-        self.team = RoundRobinGroupChat(
-            self.agents, termination_condition=self.text_termination
-        )
+        self.team = self._build_team()
         print("New team created from existing agents.")
 
-    def count_token_input(self, text):
-        text = self.text_input
-
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-        tokens = encoding.encode(text)
-        token_count = len(tokens)
+    def count_token_input(self, text=None):
+        if text is None:
+            text = self.text_input
 
-        return token_count
+        return count_tokens(text)
 
     def check_token_limit(self, text=None, max_token_limit=1000):
         input_text = text if text is not None else self.text_input
@@ -775,5 +1411,5 @@ class Palette:
     def get_surveillance_logs(self):
         """Get logs from the surveillance agent."""
         if hasattr(self, "surveillance"):
-            return self.surveillance.log_messages
+            return self.surveillance.get_logs()
         return []
@@ -1,20 +1,22 @@
 
-import asyncio
 import os
-import pickle
-import sys
 from dotenv import load_dotenv
+from config_loader import load_config
 from palette import Palette
+from result_cache import result_cache_from_env
+from worker_pool import serve_worker
 
 load_dotenv()
 
-def main():
-    # Get input from stdin
-    input_data = sys.stdin.buffer.read()
-    question = pickle.loads(input_data)
-    
+# Opt-in cache of whole-team results, selected by PALETTE_RESULT_CACHE
+result_cache = result_cache_from_env()
+
+def build_palette():
+    config_path = os.getenv("PALETTE_CONFIG")
+    if config_path:
+        return Palette(config=load_config(config_path), result_cache=result_cache)
     # Initialize Palette with the same parameters as in your app
-    team = Palette(
+    return Palette(
         "ollama",
         "openai",
         "openai",
@@ -40,13 +42,10 @@ def main():
         behaviour_3="Code_Tester2",
         behaviour_4="Code_Tester3",
         token_threshold=150,
+        result_cache=result_cache,
+        ollama_keep_alive=os.getenv("PALETTE_OLLAMA_KEEP_ALIVE", "30m"),
     )
-    
-    # Run the team and get the result
-    result = team.run_team(question)
-    
-    # Write result to stdout
-    sys.stdout.buffer.write(pickle.dumps(result))
 
 if __name__ == "__main__":
-    main()
+    # Keep a warm Palette and answer questions until the pool closes stdin
+    serve_worker(build_palette)
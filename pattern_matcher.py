@@ -0,0 +1,168 @@
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+
+class PatternMatch(NamedTuple):
+    """One pattern found in a text."""
+
+    category: str
+    text: str
+    start: int
+    end: int
+
+
+def _trie_regex(node) -> str:
+    """Regex source for a trie of lowercase patterns, longest match first."""
+    branches = []
+    endings = []
+    for char in sorted(key for key in node if key):
+        rest = _trie_regex(node[char])
+        if rest:
+            branches.append(re.escape(char) + rest)
+        else:
+            endings.append(re.escape(char))
+    if len(endings) == 1:
+        branches.append(endings[0])
+    elif endings:
+        branches.append(f"[{''.join(endings)}]")
+    if not branches:
+        return ""
+    source = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if "" in node:
+        # A pattern ends here, but a longer one may continue
+        source = f"(?:{source})?"
+    return source
+
+
+class PatternMatcher:
+    """Finds many literal patterns in one pass, ignoring case.
+
+    Patterns and text are compared lowercased. All patterns are compiled
+    into a single regex shaped like a trie, so patterns sharing a prefix
+    are tried together and a scan costs one pass over the text however
+    many patterns are registered. Each match is mapped back to its
+    category by lookup. The longest pattern wins where
+    several start at the same offset, and matches never overlap. A pattern
+    registered under two categories belongs to the first.
+
+    ``category`` tells which category a text belongs to without those
+    rules getting in the way: it sees every pattern in the text, including
+    ones inside or overlapping a longer match.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, Iterable[str]]] = None):
+        self._patterns: Dict[str, List[str]] = {}
+        self._compiled = None
+        self._lock = threading.Lock()
+        for category, category_patterns in (patterns or {}).items():
+            self.add(category, *category_patterns)
+
+    def add(self, category: str, *patterns: str):
+        """Register patterns under ``category``, creating it if needed."""
+        with self._lock:
+            existing = self._patterns.setdefault(category, [])
+            for pattern in patterns:
+                if pattern and pattern.lower() not in map(str.lower, existing):
+                    existing.append(pattern)
+            self._compiled = None
+
+    def remove(self, category: str):
+        """Forget a category and all its patterns."""
+        with self._lock:
+            self._patterns.pop(category, None)
+            self._compiled = None
+
+    @property
+    def categories(self) -> List[str]:
+        """Categories in the order they were registered."""
+        return list(self._patterns)
+
+    def patterns(self) -> Dict[str, List[str]]:
+        return {category: list(items) for category, items in self._patterns.items()}
+
+    def _compile(self):
+        compiled = self._compiled
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            if self._compiled is None:
+                trie = {}
+                lookup = {}
+                for category, patterns in self._patterns.items():
+                    for pattern in patterns:
+                        lookup.setdefault(pattern.lower(), category)
+                        node = trie
+                        for char in pattern.lower():
+                            node = node.setdefault(char, {})
+                        node[""] = {}
+                source = _trie_regex(trie)
+                # A match also contains every shorter pattern inside it; rank
+                # each pattern by the earliest category it implies
+                ranks = {category: rank for rank, category in enumerate(self._patterns)}
+                implied = {
+                    pattern: min(
+                        ranks[lookup[other]] for other in lookup if other in pattern
+                    )
+                    for pattern in lookup
+                }
+                self._compiled = (
+                    re.compile(source) if source else None,
+                    lookup,
+                    # The longest match at every offset, overlaps included
+                    re.compile(f"(?=({source}))") if source else None,
+                    implied,
+                    list(self._patterns),
+                )
+            return self._compiled
+
+    def scan(self, text: str) -> List[PatternMatch]:
+        """Every match in ``text``, in order of offset."""
+        regex, lookup, *_ = self._compile()
+        if regex is None or not text:
+            return []
+        # Matching lowered text exactly is several times faster than
+        # re.IGNORECASE
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return [
+                PatternMatch(
+                    lookup[match.group()],
+                    text[match.start() : match.end()],
+                    *match.span(),
+                )
+                for match in regex.finditer(lowered)
+            ]
+
+        # A few non-ASCII letters lower to several characters; map offsets back
+        origins = [index for index, char in enumerate(text) for _ in char.lower()]
+        matches = []
+        for match in regex.finditer(lowered):
+            start = origins[match.start()]
+            end = origins[match.end() - 1] + 1
+            matches.append(
+                PatternMatch(lookup[match.group()], text[start:end], start, end)
+            )
+        return matches
+
+    def category(self, text: str) -> Optional[str]:
+        """The earliest-registered category with a pattern anywhere in ``text``."""
+        _, _, regex, implied, categories = self._compile()
+        if regex is None or not text:
+            return None
+        best = None
+        for match in regex.finditer(text.lower()):
+            rank = implied[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return None if best is None else categories[best]
+
+    def category_of(self, matches: List[PatternMatch]) -> Optional[str]:
+        """The earliest-registered category among ``matches``, if any."""
+        found = {match.category for match in matches}
+        for category in self._patterns:
+            if category in found:
+                return category
+        return None
@@ -0,0 +1,156 @@
+import time
+from typing import Optional, Sequence
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import StopMessage
+
+
+class QuorumTermination(TerminationCondition):
+    """Stop once enough reviewers approve the same primary answer.
+
+    Every message from ``primary_source`` starts a new round. A reviewer
+    approves by mentioning ``termination_text``, and the run stops as soon
+    as ``approvals`` different reviewers approved the round's answer. With
+    a ``time_budget`` (seconds), a round that has run longer than the
+    budget stops on its first approval instead of waiting for the quorum.
+
+    Calling the condition with no messages re-checks the time budget, so a
+    team waiting on slow reviewers can poll it at ``deadline()``.
+    """
+
+    def __init__(
+        self,
+        termination_text: str,
+        primary_source: str,
+        approvals: int = 1,
+        time_budget: Optional[float] = None,
+    ):
+        if approvals < 1:
+            raise ValueError("A quorum needs at least one approval")
+        self.termination_text = termination_text
+        self.primary_source = primary_source
+        self.approvals = approvals
+        self.time_budget = time_budget
+        self._approved_by = set()
+        self._round_started = time.monotonic()
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    @property
+    def approved_by(self):
+        """Reviewers that approved the current round's answer."""
+        return set(self._approved_by)
+
+    def deadline(self) -> Optional[float]:
+        """``time.monotonic()`` value at which one approval becomes enough."""
+        if self.time_budget is None:
+            return None
+        return self._round_started + self.time_budget
+
+    def _budget_spent(self) -> bool:
+        deadline = self.deadline()
+        return deadline is not None and time.monotonic() >= deadline
+
+    def required(self) -> int:
+        """Approvals needed to stop right now."""
+        return 1 if self._budget_spent() else self.approvals
+
+    def rejected(self, outstanding: int) -> bool:
+        """True once the round can't be approved even if every outstanding
+        reviewer approves."""
+        needed = 1 if self.time_budget is not None else self.approvals
+        return len(self._approved_by) + outstanding < needed
+
+    async def __call__(self, messages: Sequence) -> Optional[StopMessage]:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+
+        for message in messages:
+            if message.source == self.primary_source:
+                self._approved_by = set()
+                self._round_started = time.monotonic()
+            elif (
+                message.source != "user" and self.termination_text in message.to_text()
+            ):
+                self._approved_by.add(message.source)
+
+        if self._approved_by and len(self._approved_by) >= self.required():
+            self._terminated = True
+            return StopMessage(
+                content=f"Quorum reached: {len(self._approved_by)} approval(s)",
+                source="QuorumTermination",
+            )
+        return None
+
+    async def reset(self):
+        self._approved_by = set()
+        self._round_started = time.monotonic()
+        self._terminated = False
+
+
+class ApprovalTermination(TerminationCondition):
+    """Wraps the condition that stops a run on approval and records that it did.
+
+    Teams reset their termination conditions once a run stops, so the
+    wrapped condition's ``terminated`` is gone by the time the result is
+    read. ``approved`` survives resets until ``clear`` is called before the
+    next run.
+    """
+
+    def __init__(self, condition: TerminationCondition):
+        self.condition = condition
+        self.approved = False
+
+    @property
+    def terminated(self) -> bool:
+        return self.condition.terminated
+
+    async def __call__(self, messages: Sequence) -> Optional[StopMessage]:
+        stop = await self.condition(messages)
+        if stop is not None:
+            self.approved = True
+        return stop
+
+    async def reset(self):
+        await self.condition.reset()
+
+    def clear(self):
+        self.approved = False
+
+
+class TurnLimitTermination(TerminationCondition):
+    """Stop after ``limit`` agent turns; with no limit it never stops.
+
+    ``limit`` may be changed between runs. The team checks the condition as
+    each turn ends, so the run stops exactly at the limit, unlike an
+    ``ExternalTermination`` set by whoever is reading the stream.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self._turns = 0
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence) -> Optional[StopMessage]:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+
+        self._turns += sum(1 for message in messages if message.source != "user")
+        if self.limit and self._turns >= self.limit:
+            self._terminated = True
+            return StopMessage(
+                content=f"Turn limit reached: {self._turns} turn(s)",
+                source="TurnLimitTermination",
+            )
+        return None
+
+    async def reset(self):
+        self._turns = 0
+        self._terminated = False
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CachedResult = Tuple[List[Dict], int]
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold and collapse whitespace so trivially different asks match."""
+    return re.sub(r"\s+", " ", question).strip().casefold()
+
+
+def cache_key(question: str, team_signature: Dict[str, Any]) -> str:
+    """Hash of the normalized question plus the team's signature."""
+    payload = json.dumps(
+        [normalize_question(question), team_signature], sort_keys=True, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """Interface for caches of whole-team results.
+
+    Values are ``(conversation_list, token_count)`` tuples as returned by
+    ``Palette.run_team``. Entries expire after ``ttl`` seconds and the
+    least recently used ones are dropped beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.time() - stored_at > self.ttl
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        result = self._get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, conversation: List[Dict], token_count: int):
+        raise NotImplementedError
+
+    def _get(self, key: str) -> Optional[CachedResult]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        pass
+
+
+class MemoryResultCache(ResultCache):
+    """Results held in an in-process LRU."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries, ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            conversation, token_count, stored_at = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(conversation), token_count
+
+    def put(self, key, conversation, token_count):
+        with self._lock:
+            self._entries[key] = (list(conversation), token_count, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskResultCache(ResultCache):
+    """Results in a local SQLite file, shared by every process using it.
+
+    Pool workers pointed at the same file answer each other's repeated
+    questions.
+    """
+
+    def __init__(
+        self,
+        path: str = "palette_results.db",
+        max_entries: int = 10000,
+        ttl: Optional[float] = None,
+    ):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                conversation TEXT NOT NULL,
+                token_count INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at);
+            """)
+
+    def _get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT conversation, token_count, stored_at FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            conversation, token_count, stored_at = row
+            if self._expired(stored_at):
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._db.execute(
+                "UPDATE results SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(conversation), token_count
+
+    def put(self, key, conversation, token_count):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(conversation), token_count, now, now),
+                )
+                # Drop the least recently used results beyond max_entries
+                self._db.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                    "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                if self.ttl:
+                    self._db.execute(
+                        "DELETE FROM results WHERE stored_at < ?", (now - self.ttl,)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def result_cache_from_env() -> Optional[ResultCache]:
+    """Build the cache selected by PALETTE_RESULT_CACHE, or None when unset."""
+    backend = os.getenv("PALETTE_RESULT_CACHE")
+    if not backend:
+        return None
+    ttl = os.getenv("PALETTE_RESULT_CACHE_TTL")
+    ttl = float(ttl) if ttl else None
+    max_entries = int(os.getenv("PALETTE_RESULT_CACHE_SIZE", "1024"))
+    if backend == "disk":
+        return DiskResultCache(
+            os.getenv("PALETTE_RESULT_CACHE_PATH", "palette_results.db"),
+            max_entries=max_entries,
+            ttl=ttl,
+        )
+    return MemoryResultCache(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple
+
+
+class SurveillanceRecord(NamedTuple):
+    """One structured surveillance log entry."""
+
+    timestamp: float
+    level: str
+    type: str
+    payload: Dict[str, Any]
+
+
+def format_record(record: SurveillanceRecord) -> str:
+    """Render a record the way the logs page shows it."""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+    return f"[{timestamp}] {record.payload['message']}"
+
+
+class RingBuffer:
+    """Fixed-capacity buffer that overwrites its oldest items.
+
+    Appends take a lock so concurrent writers never clash. Reads don't:
+    ``snapshot`` copies the slots and retries if a write landed while it
+    was copying, so readers never block the writer.
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+        self.capacity = capacity
+        self._slots: List[Any] = [None] * capacity
+        # Seqlock counters: started is bumped before a slot is written and
+        # finished after, so a reader can tell whether its copy is torn.
+        self._started = 0
+        self._finished = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """Number of items ever appended, including overwritten ones."""
+        return self._finished
+
+    def __len__(self) -> int:
+        return min(self._finished, self.capacity)
+
+    def __bool__(self) -> bool:
+        return self._finished > 0
+
+    def append(self, item):
+        with self._lock:
+            self._started += 1
+            self._slots[self._finished % self.capacity] = item
+            self._finished += 1
+
+    def snapshot(self) -> List[Any]:
+        """Items currently held, oldest first."""
+        while True:
+            finished = self._finished
+            slots = self._slots[:]
+            if self._started == finished:
+                break
+
+        if finished <= self.capacity:
+            return slots[:finished]
+        start = finished % self.capacity
+        return slots[start:] + slots[:start]
+
+    def latest(self, count: int) -> List[Any]:
+        """The ``count`` most recent items, oldest first."""
+        return self.snapshot()[-count:] if count > 0 else []
+
+    def clear(self):
+        with self._lock:
+            self._slots = [None] * self.capacity
+            self._started = 0
+            self._finished = 0
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+from typing import Callable, Dict, Optional
+
+from pattern_matcher import PatternMatcher
+from token_counter import count_tokens
+
+# Smallest team first; a task the classifier sends to one tier escalates to
+# the next when it isn't handled there
+TIERS = ("solo", "pair", "full")
+
+# Words that suggest a task needs more than one reviewer
+HARD_KEYWORDS = [
+    "optimize",
+    "optimise",
+    "complexity",
+    "concurrent",
+    "concurrency",
+    "thread",
+    "distributed",
+    "architecture",
+    "design",
+    "prove",
+    "proof",
+    "dynamic programming",
+    "graph",
+    "refactor",
+    "security",
+    "edge case",
+    "scalab",
+]
+
+_hard_matcher = PatternMatcher({"hard": HARD_KEYWORDS})
+
+
+def classify_task(text: str, solo_tokens: int = 30, pair_tokens: int = 300) -> str:
+    """Pick the smallest tier likely to handle ``text``.
+
+    Short tasks without hard keywords go to the primary agent alone, long
+    tasks or tasks with several hard keywords to the full team, and the
+    rest to the primary and one reviewer.
+    """
+    tokens = count_tokens(text)
+    hard = len({match.text.lower() for match in _hard_matcher.scan(text)})
+    if hard >= 2 or tokens > pair_tokens:
+        return "full"
+    if hard == 0 and tokens <= solo_tokens:
+        return "solo"
+    return "pair"
+
+
+class RouterStats:
+    """Per-tier counters, shared by every router of a process.
+
+    ``routed`` counts tasks the classifier sent to a tier, ``attempts`` the
+    runs on it (escalations included), ``accepted`` the runs it settled
+    (approved, or answered for solo) and ``escalated`` the ones handed to
+    the next tier. The hit rate is accepted over attempts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = {
+                tier: {"routed": 0, "attempts": 0, "accepted": 0, "escalated": 0}
+                for tier in TIERS
+            }
+
+    def record(self, tier: str, outcome: str):
+        with self._lock:
+            self._counts[tier][outcome] += 1
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                tier: {
+                    **counts,
+                    "hit_rate": (
+                        counts["accepted"] / counts["attempts"]
+                        if counts["attempts"]
+                        else None
+                    ),
+                }
+                for tier, counts in self._counts.items()
+            }
+
+
+default_router_stats = RouterStats()
+
+
+class TieredRouter:
+    """Runs each task on the smallest team likely to handle it.
+
+    Wraps a full ``Palette`` and offers the same run methods. The "solo"
+    tier is the primary agent alone (a two-agent clone stopped after its
+    first turn, so the reviewer's model is never called). The "pair" tier
+    is the primary and the first reviewer, capped at ``pair_max_turns``
+    turns, and "full" is the wrapped team. A pair run that ends without
+    approval, or a solo run without an answer, is escalated to the next
+    tier; the full team's answer is kept either way. Clones are built on
+    first use and share the registry's model clients.
+    """
+
+    def __init__(
+        self,
+        palette,
+        classifier: Optional[Callable[[str], str]] = None,
+        stats: Optional[RouterStats] = None,
+        pair_max_turns: int = 4,
+    ):
+        self.palette = palette
+        self.classifier = classifier or classify_task
+        self.stats = stats or default_router_stats
+        self.pair_max_turns = pair_max_turns
+        self._teams = {"full": palette}
+        self.last_tier = None
+        self.last_run_stats = {}
+
+    def team(self, tier: str):
+        if tier not in self._teams:
+            if tier == "solo":
+                team = self.palette.with_agents(2, max_turns=1, auto_monitor=False)
+            elif tier == "pair":
+                team = self.palette.with_agents(
+                    2, max_turns=self.pair_max_turns, auto_monitor=False
+                )
+            else:
+                raise ValueError(f"Unknown tier: {tier}")
+            self._teams[tier] = team
+        return self._teams[tier]
+
+    def _accepted(self, tier, team, conversation, usage) -> bool:
+        if usage.get("cached"):
+            return True
+        if tier == "solo":
+            return any(
+                message["source"] == team.behaviour_1 and message["content"]
+                for message in conversation
+            )
+        return bool(usage.get("approved"))
+
+    async def astream_team(self, text: str):
+        """Yield the events of each tier tried, like ``Palette.astream_team``.
+
+        Each escalation is announced with a ``{"type": "reset"}`` event, and
+        the final usage event adds up the tokens of every tier with the
+        ``tier`` that answered and the ``tiers`` tried.
+        """
+        tier = self.classifier(text)
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier: {tier}")
+        self.stats.record(tier, "routed")
+        token_count = 0
+        tried = []
+        for tier in TIERS[TIERS.index(tier) :]:
+            team = self.team(tier)
+            tried.append(tier)
+            self.stats.record(tier, "attempts")
+            await team.resetting_team()
+            conversation = []
+            usage = {}
+            async for event in team.astream_team(text):
+                event_type = event.get("type")
+                if event_type == "usage":
+                    usage = event
+                    continue
+                if event_type is None:
+                    conversation.append(event)
+                yield event
+                if event_type == "error":
+                    self.last_tier = tier
+                    return
+            token_count += usage.get("token_count", 0)
+
+            if self._accepted(tier, team, conversation, usage):
+                self.stats.record(tier, "accepted")
+                break
+            if tier == TIERS[-1]:
+                break
+            self.stats.record(tier, "escalated")
+            # The next team echoes the task again, like a restarted run
+            yield {
+                "source": "system",
+                "type": "reset",
+                "content": f"The {tier} team didn't settle it, escalating.",
+            }
+
+        self.last_tier = tier
+        self.last_run_stats = {**team.last_run_stats, "tier": tier, "tiers": tried}
+        yield {
+            **usage,
+            "token_count": token_count,
+            "tier": tier,
+            "tiers": tried,
+        }
+
+    async def arun_team(self, text: str):
+        """Answer ``text`` and return ``(conversation_list, token_count)``.
+
+        The conversation is the one of the tier that answered.
+        """
+        conversation_list = []
+        token_count = 0
+        async for event in self.astream_team(text):
+            event_type = event.get("type")
+            if event_type == "usage":
+                token_count = event["token_count"]
+            elif event_type == "error":
+                return [], 0
+            elif event_type == "reset":
+                conversation_list = []
+            else:
+                conversation_list.append(event)
+        return conversation_list, token_count
+
+    def run_team(self, text: str):
+        return asyncio.run(self.arun_team(text))
+
+    async def resetting_team(self):
+        for team in self._teams.values():
+            await team.resetting_team()
+
+    def cancel_run(self):
+        for team in self._teams.values():
+            team.cancel_run()
+
+    def get_surveillance_logs(self):
+        return self._teams.get(self.last_tier, self.palette).get_surveillance_logs()
+
+    async def aclose(self):
+        for team in self._teams.values():
+            await team.aclose()
+        self._teams = {"full": self.palette}
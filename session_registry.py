@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ring_buffer import RingBuffer, SurveillanceRecord, format_record
+
+
+class Session:
+    """State kept for one conversation: its Palette and surveillance logs.
+
+    In-process sessions own a Palette, created on the first question and
+    reused afterwards. Sessions served by the worker pool have no local
+    Palette; the log records shipped back with each job are kept in
+    ``logs`` instead.
+    """
+
+    def __init__(
+        self,
+        conversation_id: str,
+        palette_factory: Optional[Callable[[], Any]] = None,
+        log_capacity: int = 100,
+    ):
+        self.conversation_id = conversation_id
+        self.palette_factory = palette_factory
+        self.palette = None
+        self.logs = RingBuffer(log_capacity)
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self._lock = asyncio.Lock()
+
+    def touch(self):
+        self.last_access = time.time()
+
+    def get_palette(self):
+        if self.palette is None:
+            self.palette = self.palette_factory()
+        return self.palette
+
+    async def run(self, question):
+        """Answer a question on this session's Palette from a clean team."""
+        async with self._lock:
+            palette = self.get_palette()
+            await palette.resetting_team()
+            return await palette.arun_team(question)
+
+    async def stream(self, question):
+        """Like ``run`` but yields the Palette's stream events."""
+        async with self._lock:
+            palette = self.get_palette()
+            await palette.resetting_team()
+            async for event in palette.astream_team(question):
+                yield event
+
+    def record_logs(self, records: List[SurveillanceRecord]):
+        for record in records:
+            self.logs.append(record)
+
+    def get_logs(self) -> List[str]:
+        """Surveillance logs for this conversation as display strings."""
+        if self.palette is not None:
+            return self.palette.get_surveillance_logs()
+        return [format_record(record) for record in self.logs.snapshot()]
+
+    async def close(self):
+        if self.palette is not None:
+            await self.palette.aclose()
+            self.palette = None
+
+
+class SessionRegistry:
+    """Sessions by conversation ID, evicted after ``ttl`` seconds idle."""
+
+    def __init__(
+        self,
+        palette_factory: Optional[Callable[[], Any]] = None,
+        ttl: float = 1800.0,
+    ):
+        self.palette_factory = palette_factory
+        self.ttl = ttl
+        self._sessions: Dict[str, Session] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return now - session.last_access > self.ttl
+
+    def get(self, conversation_id: str) -> Optional[Session]:
+        session = self._sessions.get(conversation_id)
+        if session is None or self._expired(session, time.time()):
+            return None
+        session.touch()
+        return session
+
+    def get_or_create(self, conversation_id: str) -> Session:
+        session = self.get(conversation_id)
+        if session is None:
+            stale = self._sessions.pop(conversation_id, None)
+            if stale is not None:
+                asyncio.ensure_future(stale.close())
+            session = Session(conversation_id, self.palette_factory)
+            self._sessions[conversation_id] = session
+        return session
+
+    async def evict_expired(self) -> int:
+        """Close and drop idle sessions; returns how many were evicted."""
+        now = time.time()
+        expired = [
+            conversation_id
+            for conversation_id, session in self._sessions.items()
+            if self._expired(session, now)
+        ]
+        for conversation_id in expired:
+            await self._sessions.pop(conversation_id).close()
+        return len(expired)
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions = {}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "ttl": self.ttl,
+            "live_palettes": sum(
+                1 for session in self._sessions.values() if session.palette is not None
+            ),
+        }
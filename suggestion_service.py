@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+
+class TokenBucket:
+    """Token-bucket limiter: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class SuggestionService:
+    """Cached, coalesced and rate-limited access to AI suggestions.
+
+    Answers are cached for ``ttl`` seconds under ``(kind, hash(context))``.
+    Concurrent requests for the same key share one outbound call, and
+    outbound calls are limited by a token bucket. A request that would
+    exceed the limit gets the caller's fallback instead of waiting.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        rate: float = 0.5,
+        burst: int = 5,
+        max_entries: int = 256,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._bucket = TokenBucket(rate, burst)
+        self._cache = OrderedDict()
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "calls": 0,
+            "rate_limited": 0,
+            "errors": 0,
+        }
+
+    @staticmethod
+    def key(kind: str, context: str):
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=16).digest()
+        return kind, digest
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _store(self, key, value: str):
+        self._cache[key] = (value, time.monotonic() + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def get(
+        self,
+        kind: str,
+        context: str,
+        fetch: Callable[[], Awaitable[str]],
+        fallback: str,
+        may_call: bool = True,
+    ) -> str:
+        """Return a suggestion for ``context``, calling ``fetch`` at most once.
+
+        ``may_call=False`` lets the caller veto the outbound call (for
+        example when its own call budget is spent); cached answers are
+        still returned.
+        """
+        key = self.key(kind, context)
+
+        value = self._cached(key)
+        if value is not None:
+            self._stats["hits"] += 1
+            return value
+        self._stats["misses"] += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except Exception:
+                return fallback
+
+        if not may_call or not self._bucket.try_acquire():
+            self._stats["rate_limited"] += 1
+            return fallback
+
+        self._stats["calls"] += 1
+        future = asyncio.ensure_future(fetch())
+        self._inflight[key] = future
+        try:
+            value = await asyncio.shield(future)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self._store(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Cache and rate-limit counters."""
+        return {**self._stats, "cached": len(self._cache)}
+
+
+# Shared by every SurveillanceAgent in the process
+default_suggestion_service = SuggestionService()
@@ -0,0 +1,77 @@
+from budget_planner import DEFAULT_SPEC, MODEL_CATALOG, BudgetPlanner, lookup_model
+
+
+def test_lookup_model_prefers_exact_then_variant_prefix():
+    assert lookup_model("gpt-4.1") == MODEL_CATALOG["gpt-4.1"]
+    assert lookup_model("gpt-4.1-mini") == MODEL_CATALOG["gpt-4.1-mini"]
+    assert lookup_model("gpt-4.1-mini-2025-04-14") == MODEL_CATALOG["gpt-4.1-mini"]
+    assert lookup_model("gpt-4o-2024-08-06") == MODEL_CATALOG["gpt-4o"]
+    assert lookup_model("gpt-4-0613") == MODEL_CATALOG["gpt-4"]
+    assert lookup_model("llama3.1:8b") == MODEL_CATALOG["llama3.1"]
+    assert lookup_model("gpt-4.5-preview") == DEFAULT_SPEC
+
+
+def agent(name, model, provider="openai"):
+    return {"name": name, "model": model, "provider": provider, "max_tokens": 100}
+
+
+def test_unknown_model_price_is_unknown():
+    team = [agent("primary", "acme-llm"), agent("critic", "gpt-4o-mini")]
+
+    plan = BudgetPlanner().plan(team, task_tokens=50)
+    assert plan.action == "run"
+    assert plan.unpriced == ["primary"]
+    assert plan.cost == plan.agents[1].cost
+
+    plan = BudgetPlanner(cost_budget=10.0, action="reject").plan(team, task_tokens=50)
+    assert plan.action == "reject"
+    assert any("acme-llm" in reason for reason in plan.reasons)
+
+
+def test_unknown_local_model_is_free():
+    plan = BudgetPlanner(cost_budget=0.01).plan(
+        [agent("primary", "qwen2.5-coder", "ollama")], task_tokens=50
+    )
+    assert plan.action == "run"
+    assert plan.cost == 0.0
+
+
+def test_summaries_are_planned():
+    planner = BudgetPlanner(rounds=3, summary_tokens=200)
+    policy = {"type": "summarize", "turns": 2}
+    plain = planner.plan([agent("primary", "gpt-4o"), agent("critic", "gpt-4o")], 50)
+    summarized = planner.plan(
+        [
+            agent("primary", "gpt-4o"),
+            {
+                **agent("critic", "gpt-4o"),
+                "policy": {**policy, "provider": "openai", "model": "gpt-4o-mini"},
+            },
+        ],
+        50,
+    )
+
+    critic = summarized.agents[1]
+    assert critic.summary_tokens > 0
+    assert summarized.summary_tokens == critic.summary_tokens
+    assert summarized.total_tokens == (
+        summarized.prompt_tokens
+        + summarized.completion_tokens
+        + summarized.summary_tokens
+    )
+    own = critic.prompt_tokens * 2.50 + critic.completion_tokens * 10.00
+    assert critic.cost > own / 1e6
+    assert critic.prompt_tokens < plain.agents[1].prompt_tokens
+
+
+def test_reroute_to_uncatalogued_local_model():
+    planner = BudgetPlanner(
+        cost_budget=0.0001,
+        action="reroute",
+        reroutes={"gpt-4o": {"provider": "ollama", "model": "qwen2.5-coder"}},
+    )
+    plan = planner.plan([{**agent("primary", "gpt-4o"), "slot": 1}], task_tokens=50)
+
+    assert plan.action == "reroute"
+    assert plan.overrides == {"provider_1": "ollama", "agent_1": "qwen2.5-coder"}
+    assert plan.cost == 0.0
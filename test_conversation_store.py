@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from conversation_store import (
+    ConversationStore,
+    MemoryConversationStore,
+    SQLiteConversationStore,
+)
+
+
+def test_sqlite_expired_conversation_starts_over(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "conversations.db"), ttl=0.05)
+    try:
+        store.create("c1")
+        store.append("c1", {"source": "user", "content": "old"})
+        assert store.exists("c1")
+        time.sleep(0.1)
+
+        store.create("c1")
+        assert store.exists("c1")
+        assert store.count("c1") == 0
+        assert store.read("c1") == []
+
+        store.append("c1", {"source": "user", "content": "new"})
+        assert store.read("c1") == [{"source": "user", "content": "new"}]
+        time.sleep(0.1)
+        assert not store.exists("c1")
+        assert store.count("c1") == 0
+    finally:
+        store.close()
+
+
+def test_memory_expired_conversation_starts_over():
+    store = MemoryConversationStore(ttl=0.05)
+    store.append("c1", {"source": "user", "content": "old"})
+    time.sleep(0.1)
+    store.create("c1")
+    assert store.exists("c1")
+    assert store.read("c1") == []
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ConversationStore()
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+from loop_detector import LoopDetector
+from palette import SurveillanceAgent
+
+ANSWER = (
+    "Use a hash map from each value to its index. Walk the array once and for "
+    "every number check whether target minus the number is already in the "
+    "map; if it is, return both indices, otherwise store the number with its "
+    "index and continue. This runs in linear time and linear space."
+)
+REVIEW = (
+    "The approach is right but the answer does not handle the case where the "
+    "same element would be used twice. Please check the map before inserting "
+    "the current number and explain why that avoids reusing an index."
+)
+DISTINCT = [
+    "Sort a copy of the array with the original indices and move two pointers inward.",
+    "A brute force double loop works for small inputs and is easy to verify.",
+    "Binary search the complement for each element after sorting the pairs.",
+    "Bucket the numbers by value modulo a prime and only compare within buckets.",
+]
+
+
+def near_duplicate(text, n):
+    """``text`` with its ``n``-th word changed."""
+    words = text.split()
+    words[n % len(words)] += "s"
+    return " ".join(words)
+
+
+def looping_conversation(rounds=3):
+    messages = []
+    for n in range(rounds):
+        messages.append(("primary", near_duplicate(ANSWER, n * 7)))
+        messages.append(("critic", near_duplicate(REVIEW, n * 5)))
+    return messages
+
+
+def test_near_duplicate_cycle_is_a_loop():
+    detector = LoopDetector()
+    verdicts = [detector.add(source, text) for source, text in looping_conversation()]
+
+    assert not any(verdict.loop for verdict in verdicts[:3])
+    assert verdicts[-1].loop
+    assert verdicts[-1].period == 2
+    assert verdicts[-1].similarity >= detector.threshold
+
+
+def test_distinct_answers_are_not_a_loop():
+    detector = LoopDetector()
+    verdicts = []
+    for answer in DISTINCT:
+        verdicts.append(detector.add("primary", answer))
+        verdicts.append(detector.add("critic", REVIEW.split(".")[0] + "."))
+    # The critic repeats itself, but the answers change every round
+    assert not any(verdict.loop for verdict in verdicts)
+
+
+def surveillance(threshold):
+    return SurveillanceAgent(None, gemini_api_key="", loop_threshold=threshold)
+
+
+def as_messages(conversation):
+    return [
+        SimpleNamespace(source=source, content=text) for source, text in conversation
+    ]
+
+
+def test_surveillance_detects_a_loop_at_its_threshold():
+    messages = as_messages(looping_conversation())
+
+    assert surveillance(0.7)._detect_deadlock(messages)
+    # One changed word per message keeps them near, not exact, duplicates
+    assert not surveillance(0.99)._detect_deadlock(messages)
+
+
+def test_surveillance_ignores_distinct_answers():
+    conversation = []
+    for answer in DISTINCT:
+        conversation += [("primary", answer), ("critic", near_duplicate(REVIEW, 0))]
+    assert not surveillance(0.7)._detect_deadlock(as_messages(conversation))
@@ -0,0 +1,57 @@
+import asyncio
+
+from fake_team import QUESTION, fake_team_config
+from model_factory import (
+    ModelProvider,
+    client_registry,
+    current_loop_id,
+    get_model_client,
+    release_model_client,
+)
+from palette import Palette
+
+
+def test_run_team_twice(offline):
+    palette = Palette(config=fake_team_config(approve_after=3))
+    for _ in range(2):
+        conversation, token_count = palette.run_team(QUESTION)
+        assert conversation
+        assert token_count > 0
+
+
+def test_clients_are_per_event_loop():
+    async def acquire():
+        first = get_model_client(ModelProvider.OPENAI, "gpt-4o-mini", api_key="sk-test")
+        second = get_model_client(
+            ModelProvider.OPENAI, "gpt-4o-mini", api_key="sk-test"
+        )
+        try:
+            # One loop shares one client
+            assert first is second
+            return first, client_registry.http_client(
+                ModelProvider.OPENAI, current_loop_id()
+            )
+        finally:
+            release_model_client(first)
+            release_model_client(second)
+
+    client_1, pool_1 = asyncio.run(acquire())
+    client_2, pool_2 = asyncio.run(acquire())
+    assert client_1 is not client_2
+    assert pool_1 is not pool_2
+
+
+def test_lazy_client_follows_the_loop():
+    lazy = get_model_client(
+        ModelProvider.OPENAI, "gpt-4o-mini", api_key="sk-test", lazy=True
+    )
+
+    async def build():
+        return lazy.client
+
+    try:
+        client_1 = asyncio.run(build())
+        client_2 = asyncio.run(build())
+        assert client_1 is not client_2
+    finally:
+        lazy.release()
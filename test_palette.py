@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from autogen_agentchat.conditions import ExternalTermination
+
+from fake_team import QUESTION, fake_team_config
+from palette import Palette
+from result_cache import MemoryResultCache
+
+pytestmark = pytest.mark.usefixtures("offline")
+
+
+def fake_palette(approve_after=5, **kwargs):
+    config = {**fake_team_config(approve_after), **kwargs.pop("config", {})}
+    return Palette(config=config, **kwargs)
+
+
+def test_resume_stops_after_a_review():
+    palette = fake_palette(config={"token_threshold": 10}, resume_mode="continue")
+    conversation, _ = palette.run_team(QUESTION)
+    stats = palette.last_run_stats
+
+    assert stats["resumes"] == 2
+    sources = [message["source"] for message in conversation]
+    for n, source in enumerate(sources):
+        if source == "system":
+            assert sources[n - 1] not in ("user", palette.behaviour_1)
+    # Stopping after every review costs more than redoing the turns
+    assert stats["tokens_saved"] < 0
+
+
+def test_stream_fills_the_cache():
+    cache = MemoryResultCache()
+    palette = fake_palette(approve_after=3, result_cache=cache)
+
+    async def stream():
+        return [event async for event in palette.astream_team(QUESTION)]
+
+    first = asyncio.run(stream())
+    second = asyncio.run(stream())
+
+    assert cache.stats()["hits"] == 1
+    assert second[-1]["cached"]
+    assert [e for e in second if "type" not in e] == [
+        e for e in first if "type" not in e
+    ]
+
+
+def test_clones_have_their_own_external_termination():
+    stop = ExternalTermination()
+    palette = fake_palette(config={"external_termination": stop})
+    clone = palette.clone()
+    pair = palette.with_agents(2)
+
+    assert palette.external_termination is stop
+    assert clone.external_termination is not stop
+    assert pair.external_termination not in (stop, clone.external_termination)
@@ -0,0 +1,64 @@
+from pattern_matcher import PatternMatcher
+
+# SurveillanceAgent's built-in categories, plus ones whose patterns share
+# prefixes or overlap across categories
+PATTERNS = {
+    "token_limit": ["token limit exceeded", "context length", "too many tokens"],
+    "api_failure": ["API error", "rate limit", "connection error", "timeout"],
+    "model_error": ["content policy violation", "model error", "failed to generate"],
+    "team_deadlock": ["agents not making progress", "circular conversation"],
+    "quota": ["limit exceeded", "time"],
+    "network": ["connection", "connection reset", "conn"],
+}
+
+TEXTS = [
+    "",
+    "All good, the answer is correct.",
+    "Rate limit exceeded, retry later",
+    "request TIMEOUT after 30s",
+    "The connection reset by peer",
+    "conn",
+    "Token Limit Exceeded for this model",
+    "Model Error: Failed To Generate",
+    "We hit a connection error and a timeout",
+    "CONTEXT LENGTH",
+    "the agents are not making progress in a circular conversation",
+    "lorem ipsum dolor " * 2000 + "then a content policy violation",
+    "lorem ipsum dolor " * 2000 + "ending with a timeout",
+    "İstanbul had an API ERROR",
+]
+
+
+def old_detect(patterns, text):
+    """The per-pattern scan the matcher replaced, case-insensitive on both
+    sides as the matcher is."""
+    if not text:
+        return None
+    lower_text = text.lower()
+    for category, category_patterns in patterns.items():
+        if any(pattern.lower() in lower_text for pattern in category_patterns):
+            return category
+    return None
+
+
+def test_category_matches_the_per_pattern_scan():
+    matcher = PatternMatcher(PATTERNS)
+    for text in TEXTS:
+        assert matcher.category(text) == old_detect(PATTERNS, text), text[-60:]
+
+
+def test_category_follows_registration_order():
+    # Reversed, the overlapping categories win the other way round
+    patterns = dict(reversed(list(PATTERNS.items())))
+    matcher = PatternMatcher(patterns)
+    for text in TEXTS:
+        assert matcher.category(text) == old_detect(patterns, text), text[-60:]
+
+
+def test_scan_finds_a_match_at_the_end_of_a_long_message():
+    matcher = PatternMatcher(PATTERNS)
+    text = "x" * 100000 + " Connection Reset"
+    (match,) = matcher.scan(text)
+    assert match.category == "network"
+    assert match.text == "Connection Reset"
+    assert match.end == len(text)
@@ -0,0 +1,31 @@
+import pytest
+
+from fake_team import QUESTION, fake_team_config
+from palette import Palette
+from router import RouterStats, TieredRouter
+
+pytestmark = pytest.mark.usefixtures("offline")
+
+
+def fake_router(tier, approve_after=3, **kwargs):
+    palette = Palette(config=fake_team_config(approve_after), **kwargs)
+    return TieredRouter(palette, classifier=lambda text: tier, stats=RouterStats())
+
+
+def test_time_budget_approval_is_accepted():
+    # One approval is enough once the budget is spent, not the full quorum
+    router = fake_router("full", quorum=3, quorum_time_budget=0)
+    conversation, _ = router.run_team(QUESTION)
+
+    assert conversation
+    assert router.last_run_stats["approved"]
+    assert router.stats.metrics()["full"]["accepted"] == 1
+
+
+def test_pair_time_budget_approval_is_not_escalated():
+    router = fake_router("pair", quorum=3, quorum_time_budget=0)
+    router.run_team(QUESTION)
+
+    assert router.last_tier == "pair"
+    assert router.last_run_stats["tiers"] == ["pair"]
+    assert router.stats.metrics()["pair"]["escalated"] == 0
@@ -0,0 +1,216 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+from worker_pool import (
+    FRAME_HEADER,
+    PaletteWorker,
+    PaletteWorkerPool,
+    PoolClosedError,
+    WorkerCrashedError,
+    _read_frame,
+    encode_frame,
+)
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+# A helper script whose "Palette" acts on the question: "sleep:<seconds>"
+# answers after a pause, "events:<n>" streams n messages and "crash" kills
+# the process. The usage event carries the worker's pid.
+STUB_HELPER = f"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, {REPO!r})
+from worker_pool import serve_worker
+
+
+class Logs:
+    total = 0
+
+    def latest(self, count):
+        return []
+
+
+class Surveillance:
+    log_messages = Logs()
+
+
+class StubPalette:
+    surveillance = Surveillance()
+
+    async def resetting_team(self):
+        pass
+
+    def cancel_run(self):
+        pass
+
+    async def astream_team(self, question):
+        command, _, arg = question.partition(":")
+        if command == "crash":
+            os._exit(3)
+        if command == "sleep":
+            await asyncio.sleep(float(arg))
+        for n in range(int(arg) if command == "events" else 1):
+            yield {{"source": "agent", "content": f"{{question}} {{n}}"}}
+        yield {{
+            "source": "system",
+            "type": "usage",
+            "token_count": len(question),
+            "pid": os.getpid(),
+        }}
+
+
+if __name__ == "__main__":
+    serve_worker(StubPalette)
+"""
+
+
+@pytest.fixture
+def stub_script(tmp_path):
+    path = tmp_path / "stub_helper.py"
+    path.write_text(STUB_HELPER)
+    return str(path)
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_restart_keeps_busy_and_queued_jobs(stub_script):
+    async def main():
+        pool = PaletteWorkerPool(stub_script, size=1)
+        await pool.start()
+        try:
+            busy = asyncio.ensure_future(pool.submit("sleep:0.5"))
+            await wait_for(lambda: pool.metrics()["busy_workers"] == 1)
+            queued = asyncio.ensure_future(pool.submit("hello"))
+            await wait_for(lambda: pool.metrics()["queue_depth"] == 1)
+
+            await pool.restart()
+
+            assert await asyncio.wait_for(queued, 5) == (
+                [{"source": "agent", "content": "hello 0"}],
+                5,
+            )
+            assert (await asyncio.wait_for(busy, 5))[0] == [
+                {"source": "agent", "content": "sleep:0.5 0"}
+            ]
+            metrics = pool.metrics()
+            assert metrics["jobs_completed"] == 2
+            assert metrics["jobs_failed"] == 0
+            assert metrics["idle_workers"] == 1
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_close_turns_away_queued_callers(stub_script):
+    async def main():
+        pool = PaletteWorkerPool(stub_script, size=1)
+        await pool.start()
+        busy = asyncio.ensure_future(pool.submit("sleep:0.3"))
+        await wait_for(lambda: pool.metrics()["busy_workers"] == 1)
+        queued = asyncio.ensure_future(pool.submit("hello"))
+        await wait_for(lambda: pool.metrics()["queue_depth"] == 1)
+
+        await pool.close()
+
+        with pytest.raises(PoolClosedError):
+            await asyncio.wait_for(queued, 5)
+        # The job in progress still finishes
+        assert (await asyncio.wait_for(busy, 5))[1] == len("sleep:0.3")
+
+    asyncio.run(main())
+
+
+async def answer(runner, question):
+    """All the events of one question, from a worker or a pool."""
+    return [event async for event in runner.stream(question)]
+
+
+def test_frames_round_trip():
+    messages = [
+        {"type": "run", "question": "two sum"},
+        {"type": "event", "event": {"source": "agent", "content": "é" * 1000}},
+        {"type": "done", "logs": [], "cancelled": False, "error": None},
+    ]
+    stream = io.BytesIO(b"".join(encode_frame(message) for message in messages))
+
+    assert [_read_frame(stream) for _ in messages] == messages
+    assert _read_frame(stream) is None
+
+
+def test_truncated_and_oversized_frames_end_the_input():
+    frame = encode_frame({"type": "cancel"})
+    assert _read_frame(io.BytesIO(frame[:2])) is None
+    assert _read_frame(io.BytesIO(frame[:-1])) is None
+    # A header announcing more than the stream holds
+    assert _read_frame(io.BytesIO(FRAME_HEADER.pack(1 << 30) + b"{}")) is None
+
+
+def test_worker_streams_several_frames(stub_script):
+    async def main():
+        worker = PaletteWorker(stub_script)
+        await worker.start()
+        try:
+            events = await answer(worker, "events:3")
+        finally:
+            await worker.stop()
+        assert [event["content"] for event in events[:-1]] == [
+            "events:3 0",
+            "events:3 1",
+            "events:3 2",
+        ]
+        assert events[-1]["type"] == "usage"
+
+    asyncio.run(main())
+
+
+def test_cancel_keeps_the_worker_warm(stub_script):
+    async def main():
+        worker = PaletteWorker(stub_script)
+        await worker.start()
+        try:
+            job = asyncio.ensure_future(worker.run("sleep:30"))
+            await asyncio.sleep(0.3)
+            job.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await job
+
+            assert worker.alive
+            events = await asyncio.wait_for(answer(worker, "hello"), 5)
+            assert events[0]["content"] == "hello 0"
+            assert events[-1]["pid"] == worker.process.pid
+        finally:
+            await worker.stop()
+
+    asyncio.run(main())
+
+
+def test_crashed_worker_is_recycled(stub_script):
+    async def main():
+        pool = PaletteWorkerPool(stub_script, size=1)
+        await pool.start()
+        try:
+            before = (await answer(pool, "hello"))[-1]["pid"]
+            with pytest.raises(WorkerCrashedError):
+                await pool.submit("crash")
+
+            metrics = pool.metrics()
+            assert metrics["workers_crashed"] == 1
+            assert metrics["workers_recycled"] == 1
+            assert metrics["jobs_failed"] == 1
+            after = (await answer(pool, "hello"))[-1]["pid"]
+            assert after != before
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,223 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ENCODING = "cl100k_base"
+
+_registry_lock = threading.Lock()
+_model_encodings: Dict[str, str] = {}
+
+
+class ApproximateEncoding:
+    """Offline stand-in for a tiktoken encoding.
+
+    Splits text into words and punctuation, which lands within a few
+    percent of cl100k_base on English text and code. Used only when the
+    real encoding can't be loaded, for example on a machine without network
+    access and without a tiktoken cache.
+    """
+
+    _pattern = re.compile(r"\w+|[^\w\s]")
+
+    def __init__(self, name: str):
+        self.name = f"approx:{name}"
+
+    def encode(self, text: str, **kwargs) -> List[str]:
+        return self._pattern.findall(text)
+
+    def encode_batch(self, texts: List[str], num_threads: int = 8, **kwargs):
+        return [self.encode(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """Load a tiktoken encoding once per process."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except (OSError, ValueError) as e:
+        # tiktoken downloads encodings on first use
+        print(
+            f"Could not load tiktoken encoding {name} ({type(e).__name__}); "
+            "counting tokens approximately."
+        )
+        return ApproximateEncoding(name)
+
+
+def encoding_for_model(model_name: Optional[str] = None):
+    """Return the shared encoding for a model name.
+
+    Unknown models (llama3, gemini, ...) fall back to ``cl100k_base``.
+    """
+    if not model_name:
+        return get_encoding()
+
+    with _registry_lock:
+        name = _model_encodings.get(model_name)
+        if name is None:
+            try:
+                import tiktoken
+
+                name = tiktoken.encoding_name_for_model(model_name)
+            except KeyError:
+                name = DEFAULT_ENCODING
+            _model_encodings[model_name] = name
+    return get_encoding(name)
+
+
+class TokenCountCache:
+    """Thread-safe LRU of token counts keyed by encoding and content hash."""
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encoding_name: str, text: str):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return encoding_name, digest
+
+    def get(self, key) -> Optional[int]:
+        with self._lock:
+            count = self._entries.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key, count: int):
+        with self._lock:
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+        }
+
+
+_count_cache = TokenCountCache()
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Count tokens in text, reusing the count for text seen before."""
+    encoding = encoding_for_model(model_name)
+    key = TokenCountCache.key(encoding.name, text)
+
+    count = _count_cache.get(key)
+    if count is None:
+        count = len(encoding.encode(text, disallowed_special=()))
+        _count_cache.put(key, count)
+    return count
+
+
+def count_many(
+    texts: List[str], model_name: Optional[str] = None, num_threads: int = 8
+) -> List[int]:
+    """Count tokens for many texts, batch-encoding the uncached ones.
+
+    Cache misses are encoded together with tiktoken's threaded
+    ``encode_batch``; duplicates within the batch are encoded once.
+    """
+    encoding = encoding_for_model(model_name)
+    keys = [TokenCountCache.key(encoding.name, text) for text in texts]
+
+    counts = {}
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key in counts or key in pending:
+            continue
+        count = _count_cache.get(key)
+        if count is None:
+            pending[key] = text
+        else:
+            counts[key] = count
+
+    if pending:
+        encoded = encoding.encode_batch(
+            list(pending.values()), num_threads=num_threads, disallowed_special=()
+        )
+        for key, tokens in zip(pending, encoded):
+            counts[key] = len(tokens)
+            _count_cache.put(key, len(tokens))
+
+    return [counts[key] for key in keys]
+
+
+def token_cache_info() -> Dict[str, int]:
+    """Hit/miss counters of the shared token count cache."""
+    return _count_cache.info()
+
+
+class TokenLedger:
+    """Running per-agent token totals, updated one message at a time.
+
+    Prompt and completion tokens come from the ``models_usage`` the model
+    client reported for a message. Agent messages without usage metadata
+    are counted with the tokenizer and booked as completion tokens of their
+    source. User messages are skipped: they are billed as part of the next
+    agent's prompt.
+    """
+
+    def __init__(self):
+        self.agents: Dict[str, Dict[str, int]] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def total(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def record(self, message) -> int:
+        """Add one streamed message to the totals and return its tokens."""
+        source = getattr(message, "source", "system")
+        usage = getattr(message, "models_usage", None)
+
+        if source == "user" and usage is None:
+            return 0
+        if usage is not None:
+            prompt = usage.prompt_tokens
+            completion = usage.completion_tokens
+            estimated = 0
+        else:
+            content = getattr(message, "content", message)
+            if not isinstance(content, str):
+                content = str(content)
+            prompt = 0
+            completion = count_tokens(content)
+            estimated = completion
+
+        entry = self.agents.setdefault(
+            source,
+            {"prompt_tokens": 0, "completion_tokens": 0, "estimated_tokens": 0},
+        )
+        entry["prompt_tokens"] += prompt
+        entry["completion_tokens"] += completion
+        entry["estimated_tokens"] += estimated
+
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        return prompt + completion
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals plus the per-agent breakdown, as plain dicts."""
+        return {
+            "token_count": self.total,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "agents": {source: dict(entry) for source, entry in self.agents.items()},
+        }
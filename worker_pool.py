@@ -0,0 +1,493 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any, Callable, Dict, Optional
+
+from ring_buffer import SurveillanceRecord
+
+# Every frame is a 4-byte big-endian length followed by a UTF-8 JSON object.
+#
+#   parent -> worker  {"type": "run", "question": ...}
+#                     {"type": "cancel"}
+#   worker -> parent  {"type": "event", "event": {...}}   one per stream event
+#                     {"type": "done", "logs": [...], "cancelled": bool,
+#                      "error": str or null}             ends every job
+FRAME_HEADER = struct.Struct("!I")
+
+# Seconds a worker gets to acknowledge a cancel before it is killed
+CANCEL_TIMEOUT = 5.0
+
+
+class PoolBusyError(Exception):
+    """Raised when the pool queue is full and the job is rejected."""
+
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process dies while handling a job."""
+
+
+class PoolClosedError(Exception):
+    """Raised to callers still waiting for a worker when the pool closes."""
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, default=str).encode("utf-8")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _read_frame(stream) -> Optional[Dict[str, Any]]:
+    """Read one frame from a blocking binary stream; None at end of input."""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload)
+
+
+def _write_frame(stream, message: Dict[str, Any]):
+    """Write one frame to a blocking binary stream."""
+    stream.write(encode_frame(message))
+    stream.flush()
+
+
+async def _stream_job(palette, question, channel_out, prepare_job=None):
+    """Run one question on a warm Palette, writing each event as a frame.
+
+    Returns an error message if the job could not run.
+    """
+    try:
+        await palette.resetting_team()
+        if prepare_job:
+            prepare_job(palette, question)
+        async for event in palette.astream_team(question):
+            _write_frame(channel_out, {"type": "event", "event": event})
+    except Exception as e:
+        return str(e)
+    return None
+
+
+async def _serve(palette, channel_in, channel_out, prepare_job=None):
+    loop = asyncio.get_running_loop()
+    # Frames are read on one thread so a cancel can arrive mid-job
+    reader = ThreadPoolExecutor(max_workers=1)
+
+    def next_frame():
+        return loop.run_in_executor(reader, _read_frame, channel_in)
+
+    try:
+        incoming = next_frame()
+        while True:
+            message = await incoming
+            if message is None:
+                break
+            incoming = next_frame()
+            if message.get("type") != "run":
+                # A cancel for a job that has already finished
+                continue
+
+            logs_before = palette.surveillance.log_messages.total
+            job = asyncio.ensure_future(
+                _stream_job(palette, message["question"], channel_out, prepare_job)
+            )
+            cancelled = closed = False
+            while not job.done():
+                await asyncio.wait({job, incoming}, return_when=asyncio.FIRST_COMPLETED)
+                if job.done() or not incoming.done():
+                    continue
+                message = incoming.result()
+                if message is None:
+                    closed = True
+                    job.cancel()
+                    break
+                incoming = next_frame()
+                if message.get("type") == "cancel":
+                    cancelled = True
+                    # Stop the model call in flight, not just the stream
+                    palette.cancel_run()
+                    job.cancel()
+
+            try:
+                error = await job
+            except asyncio.CancelledError:
+                error = None
+            if closed:
+                break
+
+            # Ship this job's surveillance records back with the result
+            new_logs = palette.surveillance.log_messages.total - logs_before
+            _write_frame(
+                channel_out,
+                {
+                    "type": "done",
+                    "logs": palette.surveillance.log_messages.latest(new_logs),
+                    "cancelled": cancelled,
+                    "error": error,
+                },
+            )
+    finally:
+        reader.shutdown(wait=False)
+
+
+def serve_worker(build_palette: Callable[[], Any], prepare_job=None):
+    """Worker entry point: keep one Palette warm and answer framed jobs.
+
+    Jobs arrive on stdin and their events are written to stdout as they
+    happen, one frame each (see FRAME_HEADER). The real stdout is moved
+    onto stderr so that prints from the agents cannot corrupt the channel.
+    """
+    channel_in = sys.stdin.buffer
+    channel_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    palette = build_palette()
+
+    try:
+        loop.run_until_complete(_serve(palette, channel_in, channel_out, prepare_job))
+    finally:
+        if hasattr(palette, "stop_surveillance"):
+            palette.stop_surveillance()
+        loop.close()
+
+
+class PaletteWorker:
+    """A long-lived helper process holding a warm Palette."""
+
+    def __init__(self, script: str):
+        self.script = script
+        self.process = None
+        self.jobs_done = 0
+        self.started_at = 0.0
+        self.broken = False
+        self._reading = None
+
+    @property
+    def alive(self) -> bool:
+        return (
+            not self.broken
+            and self.process is not None
+            and self.process.returncode is None
+        )
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            self.script,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self.jobs_done = 0
+        self.started_at = time.time()
+
+    async def _send(self, message: Dict[str, Any]):
+        self.process.stdin.write(encode_frame(message))
+        await self.process.stdin.drain()
+
+    async def _read_frame(self) -> Dict[str, Any]:
+        header = await self.process.stdout.readexactly(FRAME_HEADER.size)
+        (length,) = FRAME_HEADER.unpack(header)
+        return json.loads(await self.process.stdout.readexactly(length))
+
+    async def _receive(self) -> Dict[str, Any]:
+        # Shielded, so a cancelled caller never leaves half a frame unread
+        if self._reading is None:
+            self._reading = asyncio.ensure_future(self._read_frame())
+        try:
+            return await asyncio.shield(self._reading)
+        finally:
+            if self._reading.done():
+                self._reading = None
+
+    async def _cancel(self):
+        """Ask the worker to stop the current job, killing it if it won't."""
+
+        async def drain():
+            await self._send({"type": "cancel"})
+            while (await self._receive())["type"] != "done":
+                pass
+
+        try:
+            await asyncio.wait_for(drain(), CANCEL_TIMEOUT)
+        except (
+            asyncio.TimeoutError,
+            asyncio.CancelledError,
+            asyncio.IncompleteReadError,
+            BrokenPipeError,
+            ConnectionResetError,
+        ):
+            self.broken = True
+            self.process.kill()
+
+    async def stream(self, question, log_sink=None):
+        """Send one question and yield its events as the worker produces them.
+
+        Surveillance records produced by the job are passed to ``log_sink``.
+        Closing the generator early or cancelling its task cancels the job;
+        the worker stays warm unless it fails to stop within
+        ``CANCEL_TIMEOUT`` seconds.
+        """
+        try:
+            await self._send({"type": "run", "question": question})
+            while True:
+                frame = await self._receive()
+                if frame["type"] == "event":
+                    yield frame["event"]
+                    continue
+
+                if log_sink is not None:
+                    log_sink([SurveillanceRecord(*record) for record in frame["logs"]])
+                if frame["error"]:
+                    raise Exception(f"Palette worker failed: {frame['error']}")
+                return
+        except (GeneratorExit, asyncio.CancelledError):
+            await self._cancel()
+            raise
+        except (asyncio.IncompleteReadError, BrokenPipeError, ConnectionResetError):
+            self.broken = True
+            raise WorkerCrashedError(
+                f"Palette worker exited with code {self.process.returncode}"
+            )
+        finally:
+            self.jobs_done += 1
+
+    async def run(self, question, log_sink=None):
+        """Send one question and wait for ``(conversation_list, token_count)``.
+
+        Like ``Palette.arun_team``, a run that ends in an error event
+        returns ``([], 0)``.
+        """
+        conversation_list = []
+        token_count = 0
+        async with aclosing(self.stream(question, log_sink)) as events:
+            async for event in events:
+                event_type = event.get("type")
+                if event_type == "reset":
+                    conversation_list = []
+                elif event_type == "resume":
+                    conversation_list.append(
+                        {"source": "system", "content": event["content"]}
+                    )
+                elif event_type == "usage":
+                    token_count = event["token_count"]
+                elif event_type == "error":
+                    return [], 0
+                else:
+                    conversation_list.append(event)
+        return conversation_list, token_count
+
+    async def stop(self, timeout: float = 5.0):
+        if self.process is None or self.process.returncode is not None:
+            return
+        if self.broken:
+            self.process.kill()
+            await self.process.wait()
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+class PaletteWorkerPool:
+    """Fixed-size pool of warm Palette workers with a bounded wait queue.
+
+    Workers are recycled after ``max_jobs`` questions or as soon as they
+    crash. When ``max_queue`` callers are already waiting for a worker,
+    new submissions are rejected with ``PoolBusyError``.
+
+    Restarting or closing the pool never interrupts a job: busy workers
+    are retired when their job is released. A restart hands the new
+    workers to callers already queued.
+    """
+
+    def __init__(
+        self,
+        script: str = "palette_helper.py",
+        size: int = 2,
+        max_jobs: int = 25,
+        max_queue: int = 32,
+    ):
+        self.script = script
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_queue = max_queue
+
+        self._workers = []
+        self._idle = None
+        self._waiting = 0
+        self._busy = 0
+        self._stats = {
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "jobs_rejected": 0,
+            "jobs_cancelled": 0,
+            "workers_recycled": 0,
+            "workers_crashed": 0,
+        }
+
+    @classmethod
+    def from_env(cls, script: str = "palette_helper.py"):
+        """Build a pool sized from PALETTE_POOL_* environment variables."""
+        return cls(
+            script=script,
+            size=int(os.getenv("PALETTE_POOL_SIZE", "2")),
+            max_jobs=int(os.getenv("PALETTE_POOL_MAX_JOBS", "25")),
+            max_queue=int(os.getenv("PALETTE_POOL_MAX_QUEUE", "32")),
+        )
+
+    async def start(self):
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        await self._spawn()
+
+    async def _spawn(self):
+        for _ in range(self.size):
+            worker = PaletteWorker(self.script)
+            await worker.start()
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+
+    def _take_idle(self, idle: asyncio.Queue):
+        workers = []
+        while not idle.empty():
+            worker = idle.get_nowait()
+            if worker is not None:
+                workers.append(worker)
+        return workers
+
+    async def close(self):
+        """Stop the idle workers and turn away callers still queued.
+
+        Busy workers finish their job and are stopped when released.
+        """
+        idle, self._idle = self._idle, None
+        self._workers = []
+        if idle is None:
+            return
+        workers = self._take_idle(idle)
+        for _ in range(self._waiting):
+            idle.put_nowait(None)
+        for worker in workers:
+            await worker.stop()
+
+    async def restart(self):
+        """Replace every worker, e.g. after the helper script changed.
+
+        The queue is kept, so callers waiting for a worker get a new one;
+        jobs in progress finish on their old worker, which is then retired.
+        """
+        if self._idle is None:
+            await self.start()
+            return
+        retired = self._take_idle(self._idle)
+        self._workers = []
+        await self._spawn()
+        for worker in retired:
+            await worker.stop()
+
+    async def _recycle(self, worker: PaletteWorker) -> PaletteWorker:
+        await worker.stop()
+        replacement = PaletteWorker(self.script)
+        await replacement.start()
+        self._workers[self._workers.index(worker)] = replacement
+        self._stats["workers_recycled"] += 1
+        return replacement
+
+    async def _acquire(self) -> PaletteWorker:
+        if self._idle is None:
+            await self.start()
+
+        if self._idle.empty() and self._waiting >= self.max_queue:
+            self._stats["jobs_rejected"] += 1
+            raise PoolBusyError(
+                f"Palette pool is busy ({self._waiting} requests already queued)"
+            )
+
+        idle = self._idle
+        self._waiting += 1
+        try:
+            worker = await idle.get()
+        finally:
+            self._waiting -= 1
+        if worker is None:
+            raise PoolClosedError("Palette pool was closed")
+        self._busy += 1
+        return worker
+
+    async def _release(self, worker: PaletteWorker):
+        self._busy -= 1
+        if worker not in self._workers:
+            # The pool was restarted or closed while this job was running
+            await worker.stop()
+            return
+        if not worker.alive or worker.jobs_done >= self.max_jobs:
+            worker = await self._recycle(worker)
+        self._idle.put_nowait(worker)
+
+    async def stream(self, question, log_sink=None):
+        """Run a question on the next free worker, yielding events as they come.
+
+        Closing the generator early cancels the job on the worker.
+        """
+        worker = await self._acquire()
+        try:
+            async with aclosing(worker.stream(question, log_sink)) as events:
+                async for event in events:
+                    yield event
+            self._stats["jobs_completed"] += 1
+        except (GeneratorExit, asyncio.CancelledError):
+            self._stats["jobs_cancelled"] += 1
+            raise
+        except WorkerCrashedError:
+            self._stats["workers_crashed"] += 1
+            self._stats["jobs_failed"] += 1
+            raise
+        except Exception:
+            self._stats["jobs_failed"] += 1
+            raise
+        finally:
+            await self._release(worker)
+
+    async def submit(self, question, log_sink=None):
+        """Run a question on the next free worker and return its result."""
+        worker = await self._acquire()
+        try:
+            result = await worker.run(question, log_sink)
+            self._stats["jobs_completed"] += 1
+            return result
+        except asyncio.CancelledError:
+            self._stats["jobs_cancelled"] += 1
+            raise
+        except WorkerCrashedError:
+            self._stats["workers_crashed"] += 1
+            self._stats["jobs_failed"] += 1
+            raise
+        except Exception:
+            self._stats["jobs_failed"] += 1
+            raise
+        finally:
+            await self._release(worker)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool configuration, load and counters."""
+        return {
+            "size": self.size,
+            "max_jobs": self.max_jobs,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "busy_workers": self._busy,
+            "idle_workers": self._idle.qsize() if self._idle is not None else 0,
+            **self._stats,
+        }